@@ -0,0 +1,191 @@
+"""
+Generate the schedules of a whole building in one run.
+
+Usage:
+    python batch.py --out Schedule/batch
+    python batch.py --building building.json --start-date 01.02.2025 --combined Schedule/all_floors
+
+The building description is a JSON file such as
+    {"corpora": ["1A", "1B"], "floors": ["0", "1", "2"], "num_rooms": 13, "rooms": {"1A.2": 10},
+     "away": {"1A.2": {"3": [["01.07.2025", "14.07.2025"]]}}}
+where "rooms" overrides the room count of individual corpus.floor pairs and "away"
+lists, per corpus.floor and room, the date ranges (inclusive) its residents are
+away. Away dates are honoured by --assignment balanced, which also evens out
+weekend and weekday duties per room. Without --building, the 16 corpora and 3
+floors offered by the bot are used.
+
+Each floor continues the rotation the bot keeps for it in its store (--storage,
+--storage-path; by default the bot's STORAGE and STORAGE_PATH), so printed
+schedules agree with the ones residents get from the bot. The batch only reads
+those cursors.
+"""
+import os
+import json
+import time
+import argparse
+import calendar
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from holiday_index import holiday_index
+from languages import LANGUAGES, DEFAULT_LANGUAGE, get_language
+from renderers import ASSIGNMENTS, get_renderer
+from schedule_engine import resume_rotation
+from storage import STORES, open_store, RotationCursors
+
+DEFAULT_BUILDING = {
+    "corpora": [f"{number}{letter}" for number in "1234" for letter in "ABCD"],
+    "floors": ["0", "1", "2"],
+    "num_rooms": 13,
+    "rooms": {},
+    "away": {},
+}
+
+
+def load_building(path=None):
+    """
+    Read a building description, filling in defaults for missing keys.
+    """
+    building = dict(DEFAULT_BUILDING)
+    if path:
+        with open(path, "r", encoding="utf-8") as file:
+            building.update(json.load(file))
+    return building
+
+
+def building_schedules(building):
+    """
+    (corpus, floor, num_rooms) for every floor of the building.
+    """
+    return [
+        (corpus, floor, building["rooms"].get(f"{corpus}.{floor}", building["num_rooms"]))
+        for corpus in building["corpora"]
+        for floor in building["floors"]
+    ]
+
+
+def building_exclusions(building, corpus, floor):
+    """
+    {room: [dates]} of the residents of corpus.floor who are away, from the "away" ranges.
+    """
+    exclusions = {}
+    for room, ranges in building.get("away", {}).get(f"{corpus}.{floor}", {}).items():
+        days = exclusions.setdefault(int(room), [])
+        for first, last in ranges:
+            day = datetime.strptime(first, '%d.%m.%Y')
+            while day <= datetime.strptime(last, '%d.%m.%Y'):
+                days.append(day.date())
+                day += timedelta(days=1)
+    return exclusions
+
+
+def first_rooms(store, schedules, start_date):
+    """
+    {(corpus, floor): room due on start_date} from the floors' rotation cursors, each
+    counted with the holiday country saved in the cursor, as the bot does.
+    """
+    # cursors saved without a country use the bot's default one
+    default_country = os.getenv("HOLIDAY_COUNTRY", get_language(DEFAULT_LANGUAGE).holiday_country)
+    cursors = RotationCursors(store, default_country)
+    rooms = {}
+    for corpus, floor, num_rooms in schedules:
+        cursor = cursors.get(corpus, floor)
+        holidays = holiday_index(cursor["country"] if cursor is not None else default_country)
+        rooms[(corpus, floor)] = resume_rotation(cursor, num_rooms, holidays, start_date)
+    return rooms
+
+
+def render_one(renderer_name, holiday_country, corpus, floor, num_rooms, start_date, num_days, output_filename, language=DEFAULT_LANGUAGE, assignment="rotation", exclusions=None, first_room=1):
+    """
+    Render a single schedule in a worker process and return how long it took.
+    """
+    renderer = get_renderer(renderer_name, language=language, holiday_country=holiday_country, assignment=assignment)
+    started = time.perf_counter()
+    renderer.render(
+        corpus, floor, num_rooms, None, "", start_date, num_days, output_filename, language=language,
+        first_room=first_room, exclusions=exclusions,
+    )
+    return time.perf_counter() - started
+
+
+def run_batch(schedules, start_date, num_days, out_dir, renderer_name="latex", holiday_country=None, workers=None, language=DEFAULT_LANGUAGE, assignment="rotation", building=None, rooms=None):
+    """
+    Render every schedule into out_dir in parallel. rooms maps (corpus, floor) to the
+    room the schedule starts with (default: room 1). Returns {output path: seconds}.
+    """
+    building = building or DEFAULT_BUILDING
+    rooms = rooms or {}
+    os.makedirs(out_dir, exist_ok=True)
+    timings = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for corpus, floor, num_rooms in schedules:
+            output_filename = os.path.join(out_dir, f"schedule_for_{corpus.lower()}_{floor}")
+            future = executor.submit(
+                render_one, renderer_name, holiday_country, corpus, floor, num_rooms, start_date, num_days, output_filename, language,
+                assignment, building_exclusions(building, corpus, floor), rooms.get((corpus, floor), 1),
+            )
+            futures[future] = output_filename
+        for future in as_completed(futures):
+            output_filename = futures[future]
+            try:
+                timings[f"{output_filename}.pdf"] = future.result()
+            except Exception as e:
+                logging.error(f"Error generating {output_filename}: {str(e)}")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--building", help="JSON building description (default: 1A-4D, floors 0-2, 13 rooms)")
+    parser.add_argument("--start-date", help="first day, dd.mm.yyyy (default: first day of the current month)")
+    parser.add_argument("--days", type=int, help="number of days (default: length of the start month)")
+    parser.add_argument("--out", default="Schedule/batch", help="output directory for one PDF per floor")
+    parser.add_argument("--combined", help="write all floors into this single PDF (path without .pdf) instead")
+    parser.add_argument("--renderer", default=os.getenv("RENDERER", "latex"), help="latex or native")
+    parser.add_argument("--assignment", default="rotation", choices=ASSIGNMENTS, help="rotation or balanced (fair weekends, away dates)")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE, choices=sorted(LANGUAGES), help="language of the schedules")
+    parser.add_argument("--holidays", default=os.getenv("HOLIDAY_COUNTRY"), help="holiday country code (default: the language's)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--storage", default=os.getenv("STORAGE", "sqlite"), choices=sorted(STORES), help="the bot's store, for the floors' rotations")
+    parser.add_argument("--storage-path", default=os.getenv("STORAGE_PATH"), help="database/file path of the bot's store")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    start = datetime.strptime(args.start_date, '%d.%m.%Y') if args.start_date else datetime.now().replace(day=1)
+    start_date = start.strftime('%d.%m.%Y')
+    num_days = args.days or calendar.monthrange(start.year, start.month)[1]
+    building = load_building(args.building)
+    schedules = building_schedules(building)
+    rooms = first_rooms(open_store(args.storage, args.storage_path), schedules, start_date)
+
+    started = time.perf_counter()
+    if args.combined:
+        renderer = get_renderer(args.renderer, language=args.language, holiday_country=args.holidays, assignment=args.assignment)
+        renderer.render_many(
+            [
+                (
+                    corpus, floor, num_rooms, start_date, num_days, building_exclusions(building, corpus, floor),
+                    rooms[(corpus, floor)],
+                )
+                for corpus, floor, num_rooms in schedules
+            ],
+            args.combined, args.language,
+        )
+        print(f"{len(schedules)} schedules from {start_date} ({num_days} days) written to {args.combined}.pdf")
+    else:
+        timings = run_batch(
+            schedules, start_date, num_days, args.out, args.renderer, args.holidays, args.workers, args.language,
+            args.assignment, building, rooms,
+        )
+        for path, seconds in sorted(timings.items()):
+            print(f"{seconds * 1000:8.1f} ms  {path}")
+        print(f"{len(timings)}/{len(schedules)} schedules from {start_date} ({num_days} days), "
+              f"{sum(timings.values()):.2f} s of rendering")
+    print(f"total wall time: {time.perf_counter() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
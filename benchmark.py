@@ -0,0 +1,369 @@
+"""
+Benchmarks for the schedule rendering pipeline.
+
+Usage:
+    python benchmark.py latex-format --runs 5 --days 30
+    python benchmark.py pipeline --runs 5 --output results.json
+    python benchmark.py pipeline --compare results.json --tolerance 0.25
+    python benchmark.py optimizer --rooms 13 100 500 --days 365 3650 --away 0.1
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import random
+import platform
+import tempfile
+import statistics
+from types import SimpleNamespace
+
+import latex_format
+from holiday_index import holiday_index
+from renderers import LatexRenderer, get_renderer
+from datetime import timedelta
+from duty_optimizer import balanced_duties, load_variance
+from schedule_engine import iter_duties, parse_start_date
+
+PIPELINE_DAYS = (30, 365, 3650)
+PIPELINE_ROOMS = (5, 13, 50)
+OPTIMIZER_DAYS = (365, 1095, 3650)
+OPTIMIZER_ROOMS = (13, 100, 500)
+START_DATE = "01.01.2025"
+
+
+def bench_latex_format(runs, num_days, num_rooms):
+    """
+    Per-PDF wall time of a plain pdflatex compile versus one using the precompiled preamble format.
+    """
+    renderer = LatexRenderer()
+    preamble = renderer.preamble()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        format_dir = os.path.join(directory, "formats")
+        # build the format up front; it is a one-off cost paid at bot startup
+        if latex_format.build_format(preamble, format_dir) is None:
+            raise SystemExit("Could not build the LaTeX format (is mylatexformat installed?)")
+
+        for label in ("before", "after"):
+            times = []
+            for i in range(runs):
+                output_filename = os.path.join(directory, f"{label}_{i}")
+                started = time.perf_counter()
+                with open(f"{output_filename}.tex", "w", encoding="utf-8") as file:
+                    renderer.write_tex(file, "3D", "1", num_rooms, 1, "bench", "01.01.2025", num_days, preamble)
+                latex_format.compile_tex(output_filename, preamble, format_dir, use_format=(label == "after"))
+                times.append(time.perf_counter() - started)
+            results[label] = times
+    return results
+
+
+def measure(func, runs):
+    """
+    Wall times of runs calls of func, after one untimed warm-up call.
+    """
+    func()
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+class FakeMessage:
+    """
+    Stands in for telegram.Message: records what the bot sends instead of calling Telegram.
+    """
+
+    def __init__(self, text=""):
+        self.text = text
+        self.sent = []
+
+    async def reply_text(self, text, **kwargs):
+        self.sent.append(text)
+        return FakeMessage(text)
+
+    async def edit_text(self, text, **kwargs):
+        self.text = text
+
+    async def delete(self):
+        pass
+
+    async def reply_document(self, document, **kwargs):
+        # read file objects the way an upload would
+        data = document if isinstance(document, bytes) else document.read()
+        self.sent.append(data)
+        # no file_id, so every run renders again instead of resending
+        return SimpleNamespace(document=None)
+
+
+def fake_update(user_id, text):
+    message = FakeMessage(text)
+    return SimpleNamespace(
+        message=message,
+        effective_message=message,
+        effective_user=SimpleNamespace(id=user_id),
+        callback_query=None,
+    )
+
+
+def bench_handler(bot, runs, num_days, num_rooms):
+    """
+    Latency of the last dialog step (get_days_ahead) until the PDF has been handed to
+    Telegram, with the schedule cache emptied before every run.
+    """
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(bot.render_queue.start())
+
+    def run():
+        bot.schedule_cache.clear()
+        update = fake_update(1, str(num_days))
+        context = SimpleNamespace(user_data={
+            "corpus": "3D", "floor": "1", "num_rooms": num_rooms, "your_room_number": 1, "username": "bench",
+        })
+        loop.run_until_complete(bot.get_days_ahead(update, context))
+        if not any(isinstance(item, bytes) for item in update.message.sent):
+            raise RuntimeError(f"No PDF was sent: {update.message.sent}")
+
+    try:
+        return measure(run, runs)
+    finally:
+        loop.run_until_complete(bot.render_queue.shutdown())
+        loop.close()
+
+
+def load_bot(directory, renderer_name):
+    """
+    Import bot.py with its cache and store in a scratch directory.
+    """
+    os.environ.update({
+        "SCHEDULE_DIR": os.path.join(directory, "Schedule"),
+        "STORAGE": "sqlite",
+        "STORAGE_PATH": os.path.join(directory, "bench.sqlite3"),
+        "RENDERER": renderer_name,
+        "RENDER_BACKEND": "local",
+        "SPECULATIVE_DAYS": "0",
+        # every run comes from the same user; the rate limits would turn most of them away
+        "USER_BURST": "1000000",
+        "GLOBAL_BURST": "1000000",
+    })
+    import bot
+    return bot
+
+
+def bench_pipeline(runs, days_values, rooms_values, renderer_name="native"):
+    """
+    Time each pipeline stage for every (num_days, num_rooms) pair and return one
+    result dict per stage and pair. Stages that cannot run here are marked skipped.
+    """
+    has_pdflatex = shutil.which("pdflatex") is not None
+    latex = LatexRenderer()
+    native = get_renderer("native")
+    preamble = latex.preamble()
+    holidays = holiday_index("DK")
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        bot = load_bot(directory, renderer_name)
+        for num_days in days_values:
+            for num_rooms in rooms_values:
+                def schedule():
+                    for _ in iter_duties(START_DATE, num_days, num_rooms, holidays):
+                        pass
+
+                def latex_source():
+                    latex.write_tex(io.StringIO(), "3D", "1", num_rooms, 1, "bench", START_DATE, num_days, preamble)
+
+                def pdflatex():
+                    output_filename = os.path.join(directory, "compile")
+                    with open(f"{output_filename}.tex", "w", encoding="utf-8") as file:
+                        latex.write_tex(file, "3D", "1", num_rooms, 1, "bench", START_DATE, num_days, preamble)
+                    latex_format.compile_tex(output_filename, preamble)
+
+                def native_pdf():
+                    native.render_bytes("3D", "1", num_rooms, 1, "bench", START_DATE, num_days)
+
+                handler_runs = renderer_name != "latex" or has_pdflatex
+                stages = [
+                    ("schedule", lambda: measure(schedule, runs)),
+                    ("latex_source", lambda: measure(latex_source, runs)),
+                    ("pdflatex_compile", (lambda: measure(pdflatex, runs)) if has_pdflatex else None),
+                    ("native_pdf", lambda: measure(native_pdf, runs)),
+                    (
+                        f"handler_{renderer_name}",
+                        (lambda: bench_handler(bot, runs, num_days, num_rooms)) if handler_runs else None,
+                    ),
+                ]
+
+                for stage, run in stages:
+                    result = {"stage": stage, "num_days": num_days, "num_rooms": num_rooms}
+                    if run is None:
+                        result["skipped"] = True
+                    else:
+                        times = run()
+                        result.update({
+                            "runs": len(times),
+                            "median_ms": round(statistics.median(times) * 1000, 3),
+                            "min_ms": round(min(times) * 1000, 3),
+                            "max_ms": round(max(times) * 1000, 3),
+                        })
+                    results.append(result)
+                    print(format_result(result), file=sys.stderr)
+    return results
+
+
+def random_exclusions(num_rooms, num_days, away, seed=0, length=14):
+    """
+    Two-week absences for a fraction away of the rooms, one per started quarter.
+    """
+    rng = random.Random(seed)
+    start = parse_start_date(START_DATE)
+    exclusions = {}
+    for room in rng.sample(range(1, num_rooms + 1), int(num_rooms * away)):
+        days = exclusions.setdefault(room, [])
+        for quarter in range(0, num_days, 91):
+            first = quarter + rng.randrange(max(1, min(91, num_days - quarter) - length))
+            days.extend(start + timedelta(days=first + i) for i in range(length))
+    return exclusions
+
+
+def bench_optimizer(runs, days_values, rooms_values, away=0.0):
+    """
+    Time of the plain rotation versus the balanced assignment for every
+    (num_days, num_rooms) pair, with the variance of weekday and weekend duties per room.
+    """
+    holidays = holiday_index("DK")
+    results = []
+    for num_days in days_values:
+        first_day = parse_start_date(START_DATE)
+        holidays.ensure_range(first_day, first_day + timedelta(days=num_days))
+        for num_rooms in rooms_values:
+            exclusions = random_exclusions(num_rooms, num_days, away)
+            assignments = (
+                ("rotation", lambda: list(iter_duties(START_DATE, num_days, num_rooms, holidays))),
+                ("balanced", lambda: list(balanced_duties(START_DATE, num_days, num_rooms, holidays, exclusions=exclusions))),
+            )
+            for name, assign in assignments:
+                duties = assign()
+                weekday_variance, weekend_variance = load_variance(duties, num_rooms)
+                times = measure(assign, runs)
+                results.append({
+                    "assignment": name, "num_days": num_days, "num_rooms": num_rooms,
+                    "median_ms": round(statistics.median(times) * 1000, 3),
+                    "weekday_variance": round(weekday_variance, 3),
+                    "weekend_variance": round(weekend_variance, 3),
+                })
+    return results
+
+
+def format_result(result):
+    name = f"{result['stage']:<18} days={result['num_days']:<5} rooms={result['num_rooms']:<3}"
+    if result.get("skipped"):
+        return f"{name} skipped"
+    return f"{name} median {result['median_ms']:9.2f} ms  min {result['min_ms']:9.2f} ms"
+
+
+def compare(results, baseline, tolerance):
+    """
+    Results whose median is more than tolerance (a fraction) slower than the same
+    stage and size in baseline.
+    """
+    previous = {
+        (item["stage"], item["num_days"], item["num_rooms"]): item
+        for item in baseline["results"] if not item.get("skipped")
+    }
+    regressions = []
+    for item in results:
+        before = previous.get((item["stage"], item["num_days"], item["num_rooms"]))
+        if item.get("skipped") or before is None:
+            continue
+        if item["median_ms"] > before["median_ms"] * (1 + tolerance):
+            regressions.append((item, before))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    fmt_parser = subparsers.add_parser("latex-format", help="pdflatex with and without a precompiled preamble")
+    fmt_parser.add_argument("--runs", type=int, default=5)
+    fmt_parser.add_argument("--days", type=int, default=30)
+    fmt_parser.add_argument("--rooms", type=int, default=13)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="every pipeline stage over a grid of schedule sizes")
+    pipeline_parser.add_argument("--runs", type=int, default=5)
+    pipeline_parser.add_argument("--days", type=int, nargs="+", default=list(PIPELINE_DAYS))
+    pipeline_parser.add_argument("--rooms", type=int, nargs="+", default=list(PIPELINE_ROOMS))
+    pipeline_parser.add_argument("--renderer", default="native", help="renderer used by the bot handler stage")
+    pipeline_parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    pipeline_parser.add_argument("--compare", help="JSON results of an earlier run to check for regressions")
+    pipeline_parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, as a fraction")
+
+    optimizer_parser = subparsers.add_parser("optimizer", help="plain rotation versus the balanced duty assignment")
+    optimizer_parser.add_argument("--runs", type=int, default=5)
+    optimizer_parser.add_argument("--days", type=int, nargs="+", default=list(OPTIMIZER_DAYS))
+    optimizer_parser.add_argument("--rooms", type=int, nargs="+", default=list(OPTIMIZER_ROOMS))
+    optimizer_parser.add_argument("--away", type=float, default=0.1, help="fraction of rooms with absences")
+    optimizer_parser.add_argument("--budget", type=float, default=1.0, help="fail if a balanced schedule takes longer, in seconds")
+
+    args = parser.parse_args()
+    if args.benchmark == "latex-format":
+        results = bench_latex_format(args.runs, args.days, args.rooms)
+        for label, times in results.items():
+            print(
+                f"{label:>6}: median {statistics.median(times) * 1000:.0f} ms, "
+                f"min {min(times) * 1000:.0f} ms over {len(times)} PDFs ({args.days} days)"
+            )
+        speedup = statistics.median(results["before"]) / statistics.median(results["after"])
+        print(f"speedup: {speedup:.2f}x")
+
+    elif args.benchmark == "pipeline":
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "runs": args.runs,
+            "results": bench_pipeline(args.runs, args.days, args.rooms, args.renderer),
+        }
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+        else:
+            json.dump(report, sys.stdout, indent=2)
+            print()
+
+        if args.compare:
+            with open(args.compare, "r", encoding="utf-8") as file:
+                baseline = json.load(file)
+            regressions = compare(report["results"], baseline, args.tolerance)
+            for item, before in regressions:
+                print(
+                    f"REGRESSION {item['stage']} days={item['num_days']} rooms={item['num_rooms']}: "
+                    f"{before['median_ms']:.2f} ms -> {item['median_ms']:.2f} ms",
+                    file=sys.stderr,
+                )
+            if regressions:
+                sys.exit(1)
+
+    elif args.benchmark == "optimizer":
+        results = bench_optimizer(args.runs, args.days, args.rooms, args.away)
+        for item in results:
+            print(
+                f"{item['assignment']:<8} days={item['num_days']:<5} rooms={item['num_rooms']:<4} "
+                f"median {item['median_ms']:9.2f} ms  variance weekday {item['weekday_variance']:8.3f} "
+                f"weekend {item['weekend_variance']:8.3f}"
+            )
+        slow = [item for item in results if item["assignment"] == "balanced" and item["median_ms"] > args.budget * 1000]
+        for item in slow:
+            print(f"OVER BUDGET days={item['num_days']} rooms={item['num_rooms']}: {item['median_ms']:.2f} ms", file=sys.stderr)
+        if slow:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import os
+import math
+import time
+import asyncio
 import logging
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ApplicationBuilder,
+    PicklePersistence,
     CommandHandler,
     MessageHandler,
     filters,
@@ -11,13 +15,69 @@ from telegram.ext import (
     ConversationHandler,
     CallbackQueryHandler,
 )
-from datetime import datetime, timedelta
-from pylatex import Document, LongTable, NoEscape
-import holidays
+import calendar
+from datetime import datetime, timedelta, time as dt_time
+from batch import load_building, building_schedules
+from exporters import FORMATS, export
+from holiday_index import holiday_index
+from languages import LANGUAGES, DEFAULT_LANGUAGE, get_language
+from metrics import metrics
+from rate_limit import RateLimiter, TokenBucket
+from render_queue import RenderQueue, SharedRenderQueue, QueueFullError
+from renderers import get_renderer
+from schedule_cache import ScheduleCache
+from schedule_engine import room_label, RotationIndex, resume_rotation
+from storage import open_store, FileIds, RotationCursors, ScheduleExports
+from store_persistence import StorePersistence
 
 # Load environment variables
 load_dotenv()
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", "20"))
+RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "thread")  # "thread" or "process"
+# "local" renders in this process' worker pool, "shared" hands jobs to render_worker.py processes
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "local")
+SCHEDULE_DIR = os.getenv("SCHEDULE_DIR", "Schedule")
+CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "200"))
+CACHE_MAX_AGE_DAYS = int(os.getenv("CACHE_MAX_AGE_DAYS", "7"))
+CACHE_MEMORY_MB = int(os.getenv("CACHE_MEMORY_MB", "32"))
+RENDERER = os.getenv("RENDERER", "latex")  # "latex" or "native"
+# schedule length rendered speculatively while a new user is still answering (0 disables);
+# returning users get their saved length instead
+SPECULATIVE_DAYS = int(os.getenv("SPECULATIVE_DAYS", "30"))
+PROGRESS_INTERVAL = 1.5  # seconds between edits of the status message
+MAX_DAYS = int(os.getenv("MAX_DAYS", "3650"))
+BUILDING_FILE = os.getenv("BUILDING_FILE")  # floors to pre-render every month, see batch.py
+PREWARM_HOUR = int(os.getenv("PREWARM_HOUR", "3"))
+PREWARM_DAYS_BEFORE = int(os.getenv("PREWARM_DAYS_BEFORE", "3"))
+STORAGE = os.getenv("STORAGE", "sqlite")  # "sqlite" or "json"
+STORAGE_PATH = os.getenv("STORAGE_PATH")
+PERSISTENCE = os.getenv("PERSISTENCE", "pickle")  # "pickle" (local file) or "store" (shared STORAGE)
+CONVERSATION_STATE_PATH = os.getenv("CONVERSATION_STATE_PATH", "conversations.pickle")
+# Webhook mode is used when WEBHOOK_URL (the public base URL behind the reverse proxy) is set
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+SHUTDOWN_DRAIN_SECONDS = int(os.getenv("SHUTDOWN_DRAIN_SECONDS", "60"))
+# schedule requests per user: sustained rate and burst
+USER_REQUESTS_PER_MINUTE = float(os.getenv("USER_REQUESTS_PER_MINUTE", "6"))
+USER_BURST = int(os.getenv("USER_BURST", "3"))
+# new renders across all users (cache hits and shared renders are free)
+GLOBAL_RENDERS_PER_MINUTE = float(os.getenv("GLOBAL_RENDERS_PER_MINUTE", "120"))
+GLOBAL_BURST = int(os.getenv("GLOBAL_BURST", "30"))
+# Telegram user ids allowed to use /stats, comma separated
+ADMIN_IDS = {int(user_id) for user_id in os.getenv("ADMIN_IDS", "").split(",") if user_id.strip()}
+# serve Prometheus metrics on this port (disabled when empty)
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+
+# Bump whenever the PDF layout changes so stale cached schedules are not reused
+TEMPLATE_VERSION = "1"
+# overrides every language's own holiday calendar (empty to disable holidays)
+HOLIDAY_COUNTRY = os.getenv("HOLIDAY_COUNTRY")
 
 # Logging configuration
 logging.basicConfig(
@@ -25,89 +85,128 @@ logging.basicConfig(
 )
 
 # Conversation states
-CORPUS, FLOOR, NUM_ROOMS, USER_ROOM, USER_NAME, DAYS_AHEAD, CONFIRMATION = range(7)
+CORPUS, FLOOR, NUM_ROOMS, USER_ROOM, USER_NAME, DAYS_AHEAD = range(6)
+
+store = open_store(STORAGE, STORAGE_PATH)
+file_ids = FileIds(store)
+schedule_exports = ScheduleExports(store)
+# one renderer per language: the native one cannot typeset every script
+renderers = {code: get_renderer(RENDERER, language=code, holiday_country=HOLIDAY_COUNTRY) for code in LANGUAGES}
+rotation_cursors = RotationCursors(store, renderers[DEFAULT_LANGUAGE].holiday_country_for(DEFAULT_LANGUAGE))
+schedule_cache = ScheduleCache(
+    SCHEDULE_DIR,
+    max_bytes=CACHE_MAX_MB * 1024 * 1024,
+    max_age=CACHE_MAX_AGE_DAYS * 24 * 3600,
+    max_memory_bytes=CACHE_MEMORY_MB * 1024 * 1024,
+)
 
-def generate_pdf(corpus, floor, num_rooms, your_room_number, username, start_date, num_days):
+# PDF builds run here instead of on the event loop
+if RENDER_BACKEND == "shared" and STORAGE == "json":
+    # the workers take their jobs from the store, and a JSON file cannot be shared between processes
+    raise SystemExit("RENDER_BACKEND=shared needs STORAGE=sqlite; a JSON store cannot hold the shared job queue")
+if RENDER_BACKEND == "shared":
+    render_queue = SharedRenderQueue(store, max_size=RENDER_QUEUE_SIZE)
+else:
+    render_queue = RenderQueue(workers=RENDER_WORKERS, max_size=RENDER_QUEUE_SIZE, executor=RENDER_EXECUTOR)
+
+# user_id -> (cache_key, job, progress) of a render started before the dialog was finished
+speculative_renders = {}
+# cache_key -> [job, progress, waiters] of renders not finished yet, shared by identical requests
+in_flight_renders = {}
+# users whose schedule is being prepared right now
+active_deliveries = set()
+user_limiter = RateLimiter(USER_REQUESTS_PER_MINUTE / 60, USER_BURST)
+render_limiter = TokenBucket(GLOBAL_RENDERS_PER_MINUTE / 60, GLOBAL_BURST)
+# Prometheus endpoint, started in post_init when METRICS_PORT is set
+metrics_server = None
+
+def renders_in_memory(language):
+    # renderers that build the PDF in memory skip the disk entirely, unless the PDF comes from another process
+    return renderers[language].in_memory and RENDER_BACKEND != "shared"
+
+def holiday_country(language):
+    return renderers[language].holiday_country_for(language)
+
+def schedule_key(corpus, floor, num_rooms, start_date, num_days, language=DEFAULT_LANGUAGE, first_room=1):
     """
-    Generate the schedule PDF based on the user's input and return the file path.
+    Cache key of a schedule. The table does not depend on the user's own room or
+    name, so floor-mates share one file.
     """
-    os.makedirs("Schedule", exist_ok=True)
-    output_filename = f"Schedule/schedule_for_{corpus.lower()}_{floor}"
-    logging.info(f"Generating PDF file: {output_filename}")
+    return ScheduleCache.key(
+        corpus=corpus, floor=floor, num_rooms=num_rooms, start_date=start_date, num_days=num_days,
+        template=TEMPLATE_VERSION, renderer=renderers[language].name, holidays=holiday_country(language),
+        language=language, first_room=first_room,
+    )
 
-    # getting holidays using the holidays library
-    dk_holidays = holidays.CountryHoliday('DK', years=[2024, 2025])
-
-    # parsing the start date
-    start_date = datetime.strptime(start_date, '%d.%m.%Y')
-
-    # preparing the document with uniform margins and updated font size
-    doc = Document()
-    doc.preamble.append(NoEscape(r'\usepackage[table,xcdraw]{xcolor}'))
-    doc.preamble.append(NoEscape(r'\usepackage{longtable}'))
-    doc.preamble.append(NoEscape(r'\usepackage[left=1cm,right=2.2cm,top=1cm,bottom=1cm]{geometry}'))
-    doc.preamble.append(NoEscape(r'\usepackage{setspace}'))
-    doc.preamble.append(NoEscape(r'\setlength{\parindent}{0pt}'))
-    doc.preamble.append(NoEscape(r'\renewcommand{\familydefault}{\sfdefault}'))
-    doc.preamble.append(NoEscape(r'\pagenumbering{gobble}'))  # remove page numbering
-
-    # setting font size for the entire document
-    doc.append(NoEscape(r'\fontsize{14pt}{16pt}\selectfont'))
-
-    # centering the table itself
-    doc.append(NoEscape(r'\begin{center}'))
-    doc.append(NoEscape(r'Kitchen Cleaning Schedule'))
-
-    # creating a longtable for multi-page support
-    with doc.create(LongTable(r'|p{0.3\textwidth}|p{0.55\textwidth}|p{0.15\textwidth}|')) as table:
-        table.add_hline()
-        table.add_row(["Room Number", "Date (Day of the Week, dd.mm.yy)", "Checkin"])
-        table.add_hline()
-        table.end_table_header()
-        table.add_hline()
-
-        # adding table rows
-        room_number_index = 1
-        for i in range(num_days):
-            # calculating the current date
-            current_date = start_date + timedelta(days=i)
-
-            # check if the current date is a holiday
-            if current_date in dk_holidays:
-                holiday_name = dk_holidays.get(current_date)
-                # add a row for holidays with the holiday name
-                holidate = NoEscape(f"{current_date.strftime('%A')} \\hfill {current_date.strftime('%d.%m.%Y')}")
-                table.add_row([holiday_name, holidate, ""])
-                table.add_hline()
-                continue
-
-            # calculating the room number
-            room_number = (
-                f"{corpus}.{floor}.{room_number_index}"
-                if room_number_index < 10
-                else f"{corpus}.{floor}.{room_number_index}"
-            )
+def floor_rotation(corpus, floor, num_rooms, until, language=DEFAULT_LANGUAGE, save=False, since=None):
+    """
+    RotationIndex of the floor, counted from its persistent cursor and correct for
+    days before until (holidays after it are not loaded). Without a cursor, or once
+    the room count changed, the rotation is anchored afresh at the start of the month
+    of since (default: today), i.e. of the schedule being made. Only a delivered
+    schedule passes save=True to store that new anchor; lookups, exports, guesses
+    and requests that fail may carry an unconfirmed room count.
+
+    The holidays skipped are those of the floor's cursor, not of the user's
+    language; a new floor takes the country of whoever anchors it first.
+    """
+    month_start = (since or datetime.now()).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    cursor = rotation_cursors.get(corpus, floor)
+    country = cursor["country"] if cursor is not None else holiday_country(language)
+    holidays = holiday_index(country)
+    if cursor is None or cursor["num_rooms"] != num_rooms:
+        # the room whose turn it was keeps it, if it still exists
+        room = resume_rotation(cursor, num_rooms, holidays, month_start)
+        cursor = {"date": month_start.strftime('%d.%m.%Y'), "room": room, "num_rooms": num_rooms, "country": country}
+        if save:
+            rotation_cursors.set(corpus, floor, **cursor)
+            logging.info(f"Rotation of {corpus} floor {floor} starts at room {room} on {cursor['date']}")
+
+    anchor = datetime.strptime(cursor["date"], '%d.%m.%Y')
+    return RotationIndex(anchor, num_rooms, holidays.between(anchor, until), cursor["room"])
+
+def room_due_on(corpus, floor, num_rooms, start_date, language=DEFAULT_LANGUAGE, save=False):
+    """
+    Room due on the first day of a schedule starting on start_date (dd.mm.yyyy).
+    """
+    day = datetime.strptime(start_date, '%d.%m.%Y')
+    # a month pre-rendered ahead must anchor where the request on its first day will
+    rotation = floor_rotation(corpus, floor, num_rooms, day + timedelta(days=1), language, save, since=day)
+    return rotation.room_due(day)
 
-            # checking if the current room is the user's room
-            resident = username if room_number_index == your_room_number else ""
+def user_language(context):
+    """
+    The Language the user chose with /language, or the one their Telegram client reported.
+    """
+    return get_language(context.user_data.get("language"))
 
-            # formatting the date with \hfill
-            day_of_week = current_date.strftime('%A')
-            date = current_date.strftime('%d.%m.%Y')
-            formatted_date = NoEscape(f"{day_of_week}\\hfill {date}")
+def tr(context, key, **kwargs):
+    return user_language(context).text(key, **kwargs)
 
-            # adding a row to the table
-            table.add_row([room_number, formatted_date, ""])
-            table.add_hline()
+def generate_pdf(corpus, floor, num_rooms, your_room_number, username, start_date, num_days, output_filename, progress=None, language=DEFAULT_LANGUAGE, first_room=1):
+    """
+    Generate the schedule PDF at output_filename (without extension), e.g. a cache
+    path, and return the file path.
+    """
+    logging.info(f"Generating PDF file: {output_filename}")
 
-            # increment room number index
-            room_number_index = (room_number_index % num_rooms) + 1
+    return renderers[language].render(
+        corpus, floor, num_rooms, your_room_number, username, start_date, num_days, output_filename, progress, language, first_room,
+    )
 
-    doc.append(NoEscape(r'\end{center}'))
-    doc.generate_pdf(output_filename, clean_tex=False)
-    return output_filename
+def generate_pdf_bytes(corpus, floor, num_rooms, your_room_number, username, start_date, num_days, progress=None, language=DEFAULT_LANGUAGE, first_room=1):
+    """
+    Generate the schedule PDF and return its bytes instead of writing a file.
+    """
+    logging.info(f"Generating PDF in memory for {corpus} floor {floor}")
+    return renderers[language].render_bytes(
+        corpus, floor, num_rooms, your_room_number, username, start_date, num_days, progress, language, first_room,
+    )
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    # until the user picks one with /language, follow their Telegram client
+    if "language" not in context.user_data:
+        context.user_data["language"] = get_language(update.effective_user.language_code).code
     keyboard = [
         [InlineKeyboardButton("1A", callback_data='1A'), InlineKeyboardButton("1B", callback_data='1B'), InlineKeyboardButton("1C", callback_data='1C'), InlineKeyboardButton("1D", callback_data='1D')],
         [InlineKeyboardButton("2A", callback_data='2A'), InlineKeyboardButton("2B", callback_data='2B'), InlineKeyboardButton("2C", callback_data='2C'), InlineKeyboardButton("2D", callback_data='2D')],
@@ -115,11 +214,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         [InlineKeyboardButton("4A", callback_data='4A'), InlineKeyboardButton("4B", callback_data='4B'), InlineKeyboardButton("4C", callback_data='4C'), InlineKeyboardButton("4D", callback_data='4D')],
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(
-        "Welcome to the Dorm Management Bot! Let's set up your room schedule.\n\n"
-        "Please select the corpus:",
-        reply_markup=reply_markup
-    )
+    await update.message.reply_text(tr(context, "welcome"), reply_markup=reply_markup)
     return CORPUS
 
 async def get_corpus(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -129,9 +224,7 @@ async def get_corpus(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     context.user_data["corpus"] = corpus_selected
     
     # Respond without deleting the previous message
-    await query.message.reply_text(
-        f"You selected corpus: {corpus_selected}."
-    )
+    await query.message.reply_text(tr(context, "corpus_selected", corpus=corpus_selected))
 
     keyboard = [
         [InlineKeyboardButton("0", callback_data='0')],
@@ -139,7 +232,7 @@ async def get_corpus(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         [InlineKeyboardButton("2", callback_data='2')],
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.reply_text("Now, enter the floor number:", reply_markup=reply_markup)
+    await query.message.reply_text(tr(context, "ask_floor"), reply_markup=reply_markup)
     return FLOOR
 
 async def get_floor(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -148,30 +241,46 @@ async def get_floor(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     floor_selected = query.data
     context.user_data["floor"] = floor_selected  # Save the floor number
 
+    # offer the room count someone already entered for this floor
+    reply_markup = None
+    saved_rooms = store.get_floor(context.user_data["corpus"], floor_selected)
+    if saved_rooms:
+        keyboard = [[InlineKeyboardButton(tr(context, "saved_rooms", num_rooms=saved_rooms), callback_data=f'rooms:{saved_rooms}')]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+
     # Respond without deleting the previous message
-    await query.message.reply_text(
-        f"You selected floor number: {floor_selected}. How many rooms are on this floor?"
-    )
+    await query.message.reply_text(tr(context, "floor_selected", floor=floor_selected), reply_markup=reply_markup)
     return NUM_ROOMS
 
 async def get_num_rooms(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     num_rooms_text = update.message.text.strip()
     if not num_rooms_text.isdigit() or int(num_rooms_text) <= 0:
-        await update.message.reply_text("Please enter a valid number of rooms.")
+        await update.message.reply_text(tr(context, "invalid_rooms"))
         return NUM_ROOMS
     
     context.user_data["num_rooms"] = int(num_rooms_text)
-    num_rooms = context.user_data["num_rooms"]
+    speculate(update, context)
+    await ask_user_room(update.message, context)
+    return USER_ROOM
+
+async def get_saved_num_rooms(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    query = update.callback_query
+    await query.answer()
+    context.user_data["num_rooms"] = int(query.data.split(":", 1)[1])
+    speculate(update, context)
+    await ask_user_room(query.message, context)
+    return USER_ROOM
 
+async def ask_user_room(message, context):
+    num_rooms = context.user_data["num_rooms"]
     # Construct the keyboard dynamically
     keyboard = []
     for i in range(1, num_rooms + 1, 3):
         row = [InlineKeyboardButton(str(j), callback_data=str(j)) for j in range(i, min(i + 3, num_rooms + 1))]
         keyboard.append(row)
-    
+
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("Which room number is yours?", reply_markup=reply_markup)
-    return USER_ROOM
+    await message.reply_text(tr(context, "ask_room"), reply_markup=reply_markup)
 
 async def get_user_room(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
@@ -180,136 +289,686 @@ async def get_user_room(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     context.user_data["your_room_number"] = selected_room  # Save the room number
 
     # Continue the conversation without deleting the previous message
-    await query.message.reply_text(
-        f"You selected room number: {selected_room}. What is your name?"
-    )
+    await query.message.reply_text(tr(context, "room_selected", room=selected_room))
     return USER_NAME
 
 async def get_user_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     context.user_data["username"] = update.message.text
-    await update.message.reply_text("How many days ahead would you like to generate the schedule for?")
+    await update.message.reply_text(tr(context, "ask_days"))
     return DAYS_AHEAD
 
 async def get_days_ahead(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    context.user_data["num_days"] = int(update.message.text)
+    num_days_text = update.message.text.strip()
+    if not num_days_text.isdigit() or int(num_days_text) <= 0:
+        await update.message.reply_text(tr(context, "invalid_days"))
+        return DAYS_AHEAD
+    if int(num_days_text) > MAX_DAYS:
+        await update.message.reply_text(tr(context, "too_many_days", max_days=MAX_DAYS))
+        return DAYS_AHEAD
+
+    context.user_data["num_days"] = int(num_days_text)
     user_data = context.user_data
-    await update.message.reply_text(
-        f"Thank you! Here is the information you provided:\n"
-        f"- Corpus: {user_data['corpus']}\n"
-        f"- Floor: {user_data['floor']}\n"
-        f"- Number of Rooms: {user_data['num_rooms']}\n"
-        f"- Your Room: {user_data['your_room_number']}\n"
-        f"- Your Name: {user_data['username']}\n"
-        f"- Days Ahead: {user_data['num_days']}\n\n"
-        "Press the button below to generate your schedule PDF."
-    )
-    keyboard = [[InlineKeyboardButton("Generate Schedule", callback_data='generate_schedule')]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("Confirm your schedule generation:", reply_markup=reply_markup)
-    return CONFIRMATION
+    user_data["language"] = user_language(context).code
+
+    # remember the answers so /again can skip the whole dialog next time
+    store.save_profile(update.effective_user.id, {
+        key: user_data[key] for key in ("corpus", "floor", "num_rooms", "your_room_number", "username", "num_days", "language")
+    })
+    store.save_floor(user_data["corpus"], user_data["floor"], user_data["num_rooms"])
 
-async def confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    await update.message.reply_text(tr(
+        context, "summary",
+        **{key: user_data[key] for key in ("corpus", "floor", "num_rooms", "your_room_number", "username", "num_days")},
+    ))
+
+    # start rendering right away instead of waiting for a button press
+    await deliver_schedule(update, context)
+    return ConversationHandler.END
+
+async def confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    profile = store.get_profile(update.effective_user.id)
+    if not profile:
+        await query.message.reply_text(tr(context, "no_details"))
+        return
+    context.user_data.update(profile)
+    await deliver_schedule(update, context)
+
+async def again(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """
+    /again: regenerate and send the schedule from the saved profile in one step.
+    """
+    profile = store.get_profile(update.effective_user.id)
+    if not profile:
+        await update.message.reply_text(tr(context, "no_profile"))
+        return ConversationHandler.END
+
+    context.user_data.update(profile)
+    await deliver_schedule(update, context)
+    return ConversationHandler.END
+
+async def extend(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """
+    /extend [N]: send the next N days (default: the saved length) after the last
+    schedule, continuing its rotation, so only the new pages are rendered.
+    """
+    profile = store.get_profile(update.effective_user.id)
+    if not profile:
+        await update.message.reply_text(tr(context, "no_profile"))
+        return ConversationHandler.END
+    context.user_data.update(profile)
+
+    num_days = profile["num_days"]
+    if context.args:
+        if not context.args[0].isdigit() or not 0 < int(context.args[0]) <= MAX_DAYS:
+            await update.message.reply_text(tr(context, "extend_usage", max_days=MAX_DAYS))
+            return ConversationHandler.END
+        num_days = int(context.args[0])
+
+    # a schedule that ended in the past is continued from this month on
+    month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    start = month_start
+    if profile.get("schedule_end"):
+        start = max(datetime.strptime(profile["schedule_end"], '%d.%m.%Y'), month_start)
+    await deliver_schedule(update, context, start.strftime('%d.%m.%Y'), num_days)
+    return ConversationHandler.END
+
+async def deliver_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE, start_date=None, num_days=None):
+    """
+    Render the schedule and send it in one go, keeping the user informed through a
+    single status message that is edited as the render progresses. By default the
+    schedule starts this month and has the user's saved length.
+    """
+    start_date = start_date or datetime.now().replace(day=1).strftime('%d.%m.%Y')
+    num_days = num_days or context.user_data["num_days"]
+    user_id = update.effective_user.id
+    # button mashing: one delivery per user at a time
+    if user_id in active_deliveries:
+        await update.effective_message.reply_text(tr(context, "already_preparing"))
+        return
+    if not user_limiter.try_acquire(user_id):
+        metrics.increment("rate_limited_requests")
+        wait = math.ceil(user_limiter.retry_after(user_id))
+        await update.effective_message.reply_text(tr(context, "rate_limited", seconds=wait))
+        return
+
+    active_deliveries.add(user_id)
+    try:
+        started = time.perf_counter()
+        status = await update.effective_message.reply_text(tr(context, "generating"))
+        pdf_file = await render_schedule(update, context, status, start_date, num_days)
+        if not pdf_file:
+            return
+
+        context.user_data["pdf_file"] = pdf_file
+        await edit_status(status, tr(context, "sending"))
+        if await send_pdf(update, context, export_keyboard(context, context.user_data["cache_key"])):
+            await status.delete()
+            elapsed = time.perf_counter() - started
+            metrics.observe("request", elapsed)
+            logging.info(f"Schedule delivered {elapsed:.2f}s after the request")
+            remember_schedule_end(user_id, start_date, num_days)
+            # a delivered schedule is what (re-)anchors the floor's rotation; busy or
+            # failed requests leave it alone
+            user_data = context.user_data
+            corpus, floor, num_rooms = user_data["corpus"], user_data["floor"], user_data["num_rooms"]
+            language = user_language(context).code
+            room_due_on(corpus, floor, num_rooms, start_date, language, save=True)
+            # what the export buttons under the message rebuild
+            schedule_exports.set(
+                user_data["cache_key"], corpus, floor, num_rooms, start_date, num_days, language, user_data["first_room"],
+            )
+    finally:
+        active_deliveries.discard(user_id)
+
+def export_keyboard(context, cache_key):
+    # the buttons name the schedule they belong to; its parameters are in schedule_exports
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton(tr(context, f"export_{fmt}"), callback_data=f'export:{fmt}:{cache_key}')
+        for fmt in FORMATS
+    ]])
+
+async def export_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Export buttons under a schedule: send it as CSV, as an iCalendar file with the
+    user's own duties, or as JSON. Built from the duties directly, without a render.
+    """
     query = update.callback_query
     await query.answer()
-    await generate_schedule(query, context)
-    return CONFIRMATION
+    # callback data comes from the client, so only a known schedule is exported
+    fmt, _, cache_key = query.data.partition(":")[2].partition(":")
+    schedule = schedule_exports.get(cache_key) if fmt in FORMATS and cache_key else None
+    if schedule is None:
+        await query.message.reply_text(tr(context, "expired"))
+        return
 
-async def generate_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    corpus, floor, num_rooms = schedule["corpus"], schedule["floor"], schedule["num_rooms"]
+    language = get_language(schedule["language"]).code
+    # the user's own room marks their duties; it only applies to their own floor
+    profile = store.get_profile(update.effective_user.id) or {}
+    your_room_number = None
+    if (profile.get("corpus"), profile.get("floor")) == (corpus, floor):
+        your_room_number = profile.get("your_room_number")
+    if fmt == "ics" and your_room_number is None:
+        await query.message.reply_text(tr(context, "export_no_room"))
+        return
+
+    filename = f"schedule_for_{corpus.lower()}_{floor}.{fmt}"
+    try:
+        with metrics.timer("export"):
+            duties = renderers[language].duties(
+                num_rooms, your_room_number, profile.get("username", ""), schedule["start_date"], schedule["num_days"],
+                language, schedule["first_room"],
+            )
+            data = export(fmt, duties, corpus, floor, your_room_number, language)
+        await query.message.reply_document(data, filename=filename)
+        metrics.increment(f"exports_{fmt}")
+    except Exception as e:
+        logging.error(f"Error while sending the {fmt} export: {str(e)}")
+        await query.message.reply_text(tr(context, "send_error"))
+
+def remember_schedule_end(user_id, start_date, num_days):
+    # /extend continues from the day after the last schedule sent
+    profile = store.get_profile(user_id)
+    if profile:
+        end = datetime.strptime(start_date, '%d.%m.%Y') + timedelta(days=num_days)
+        profile["schedule_end"] = end.strftime('%d.%m.%Y')
+        store.save_profile(user_id, profile)
+
+async def edit_status(status, text):
+    try:
+        await status.edit_text(text)
+    except Exception as e:
+        # e.g. rate limited or the text did not change; progress messages are best effort
+        logging.debug(f"Could not update status message: {str(e)}")
+
+async def watch_render(status, job, progress, language):
+    """
+    Show the job's queue position, then its page progress, until it finishes.
+    """
+    shown = None
+    await asyncio.sleep(0)  # let an idle worker pick the job up before reporting a queue position
+    while not job.future.done():
+        position = render_queue.position(job)
+        if position > 0:
+            text = language.text("queued", position=position)
+        elif progress.get("pages"):
+            text = language.text("rendering_page", page=progress["page"], pages=progress["pages"])
+        else:
+            text = language.text("rendering")
+        if text != shown:
+            await edit_status(status, text)
+            shown = text
+        await asyncio.wait([job.future], timeout=PROGRESS_INTERVAL)
+
+def speculate(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Generate a PDF schedule based on user data after all info has been collected.
+    Start rendering as soon as corpus, floor and num_rooms are known: the table does
+    not depend on the user's room or name, so only the length is a guess. The render
+    runs while the user types and is picked up or dropped by render_schedule.
     """
     user_data = context.user_data
+    user_id = update.effective_user.id
+    profile = store.get_profile(user_id) or {}
+    num_days = profile.get("num_days") or SPECULATIVE_DAYS
+    # never let a guess delay someone else's real request
+    if not num_days or render_queue.queued() > 0:
+        return
+
     start_date = datetime.now().replace(day=1).strftime('%d.%m.%Y')
-    num_days = user_data["num_days"]
+    language = user_language(context).code
+    corpus, floor, num_rooms = user_data["corpus"], user_data["floor"], user_data["num_rooms"]
+    # the room count is not confirmed yet, so a changed one must not move the floor's rotation
+    room = room_due_on(corpus, floor, num_rooms, start_date, language)
+    cache_key = schedule_key(corpus, floor, num_rooms, start_date, num_days, language, room)
+    if file_ids.get(cache_key) or schedule_cache.contains(cache_key):
+        return
+
+    drop_speculative_render(user_id)
+    try:
+        job, progress = submit_render(corpus, floor, num_rooms, start_date, num_days, cache_key, user_id, language, room, speculative=True)
+    except QueueFullError:
+        return
+    speculative_renders[user_id] = (cache_key, job, progress)
+    logging.info(f"Speculatively rendering {num_days} days for user {user_id}: {cache_key}")
+
+def drop_speculative_render(user_id):
+    speculative = speculative_renders.pop(user_id, None)
+    if speculative is None:
+        return
+    cache_key, job, _ = speculative
+    entry = in_flight_renders.get(cache_key)
+    if entry is not None and entry[0] is job:
+        entry[2] -= 1
+        if entry[2] > 0:
+            # someone else is waiting for the same schedule
+            return
+    # a render that already started is left to finish and fill the cache
+    if not job.future.done() and render_queue.cancel(job):
+        logging.info(f"Cancelled speculative render {cache_key}")
+
+def submit_render(corpus, floor, num_rooms, start_date, num_days, cache_key, user_id=None, language=DEFAULT_LANGUAGE, first_room=1, speculative=False):
+    """
+    Queue a render of the schedule into the cache, or join an identical render that
+    is already under way. Returns the job and a dict that the render fills with page
+    progress. Raises QueueFullError when the queue or the global render budget is
+    exhausted; speculative renders are not charged to that budget.
+    """
+    entry = in_flight_renders.get(cache_key)
+    if entry is not None and not entry[0].future.done():
+        entry[2] += 1
+        metrics.increment("coalesced_renders")
+        logging.info(f"Joining in-flight render {cache_key}")
+        return entry[0], entry[1]
+    # a guess only runs on an idle queue and must not use up real requests' budget
+    if not speculative and not render_limiter.try_acquire():
+        raise QueueFullError("global render rate exceeded")
+
+    # filled in by the render thread; callbacks cannot reach other processes
+    progress = {}
+    report = None
+    if RENDER_BACKEND != "shared" and RENDER_EXECUTOR == "thread":
+        report = lambda page, pages: progress.update(page=page, pages=pages)
+    in_memory = renders_in_memory(language)
+    # the table does not show the user's room or name, so neither is passed on
+    if in_memory:
+        task = (generate_pdf_bytes, corpus, floor, num_rooms, None, "", start_date, num_days, report, language, first_room)
+    else:
+        task = (
+            generate_pdf, corpus, floor, num_rooms, None, "", start_date, num_days, schedule_cache.path(cache_key),
+            report, language, first_room,
+        )
+    job = render_queue.submit(*task, user_id=user_id)
+
+    def publish(future):
+        # runs before anyone awaiting the job resumes, so they find the PDF in the cache
+        if in_flight_renders.get(cache_key, [None])[0] is job:
+            del in_flight_renders[cache_key]
+        if future.cancelled() or future.exception() is not None:
+            return
+        if in_memory:
+            schedule_cache.put_bytes(cache_key, future.result())
+            logging.info(f"PDF generated in memory: {cache_key} ({len(future.result())} bytes)")
+        else:
+            logging.info(f"PDF file generated: {future.result()}")
+            schedule_cache.evict()
+
+    job.future.add_done_callback(publish)
+    in_flight_renders[cache_key] = [job, progress, 1]
+    return job, progress
+
+async def render_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE, status, start_date, num_days):
+    """
+    Get the user's schedule from the cache or the render queue. Returns the PDF path
+    (without extension), or None after telling the user what went wrong in the
+    status message.
+    """
+    user_data = context.user_data
     corpus = user_data["corpus"]
     floor = user_data["floor"]
     num_rooms = user_data["num_rooms"]
-    your_room_number = user_data["your_room_number"]
-    username = user_data["username"]
+    user_id = update.effective_user.id
+    language = user_language(context)
+    # the rotation only moves once the schedule has reached the user, see deliver_schedule
+    room = room_due_on(corpus, floor, num_rooms, start_date, language.code)
+
+    cache_key = schedule_key(corpus, floor, num_rooms, start_date, num_days, language.code, room)
+    user_data["cache_key"] = cache_key
+    user_data["first_room"] = room
+    speculative = speculative_renders.get(user_id)
+    if speculative is not None and speculative[0] == cache_key:
+        speculative_renders.pop(user_id)
+    else:
+        drop_speculative_render(user_id)
+        speculative = None
+
+    # already uploaded to Telegram once: no need to have the PDF on disk at all
+    if file_ids.get(cache_key):
+        metrics.increment("file_id_hits")
+        return schedule_cache.path(cache_key)
+
+    pdf_file = schedule_cache.get(cache_key)
+    if pdf_file:
+        metrics.increment("cache_hits")
+        return pdf_file
+    metrics.increment("renders")
+
+    if speculative is not None:
+        # the guess was right: the render is already under way or done
+        logging.info(f"Using speculative render {cache_key}")
+        _, job, progress = speculative
+    else:
+        try:
+            job, progress = submit_render(corpus, floor, num_rooms, start_date, num_days, cache_key, user_id, language.code, room)
+        except QueueFullError:
+            logging.warning("Render queue is full, rejecting request")
+            metrics.increment("rejected_requests")
+            await edit_status(status, language.text("busy"))
+            return None
 
     try:
-        # Generate the PDF file using a relative path
-        pdf_file = generate_pdf(corpus, floor, num_rooms, your_room_number, username, start_date, num_days)
-
-        # Store the generated PDF file path in user_data for later use
-        user_data["pdf_file"] = pdf_file
-        logging.info(f"PDF file generated and stored: {pdf_file}")
-
-        keyboard = [[InlineKeyboardButton("Send PDF", callback_data='send_pdf')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(
-            "Your schedule has been generated! Press the button below to receive the PDF file.",
-            reply_markup=reply_markup
-        )
+        with metrics.timer("render"):
+            await watch_render(status, job, progress, language)
+            await job
+        pdf_file = schedule_cache.path(cache_key)
     except Exception as e:
+        metrics.increment("render_errors")
         logging.error(f"Error generating the PDF: {str(e)}")
-        await update.message.reply_text("An error occurred while generating the PDF. Please try again.")
+        await edit_status(status, language.text("render_error"))
+        return None
+
+    return pdf_file
 
-async def send_pdf_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def send_pdf_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
-    await send_pdf(query, context)
+
+    # the button names the schedule it belongs to, so no process-local state is needed
+    _, _, cache_key = query.data.partition(":")
+    if cache_key:
+        context.user_data.update(store.get_profile(update.effective_user.id) or {})
+        context.user_data["cache_key"] = cache_key
+        context.user_data["pdf_file"] = schedule_cache.path(cache_key)
+    await send_pdf(update, context)
 
     # Send final message giving user the option to restart
-    await query.message.reply_text(
-        "If you want to start the process again, type /start."
-    )
-    return ConversationHandler.END
+    await query.message.reply_text(tr(context, "restart_hint"))
 
-async def send_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def send_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE, reply_markup=None):
     """
-    Sends the generated PDF file after it's been created.
+    Sends the generated PDF file after it's been created. Returns whether it was sent.
     """
     user_data = context.user_data
     pdf_file = user_data.get("pdf_file", None)
 
     if not pdf_file:
-        await update.message.reply_text("Error: No schedule PDF has been generated yet. Please press the 'Generate Schedule' button to create it.")
-        return
-    
+        await update.effective_message.reply_text(tr(context, "no_pdf"))
+        return False
+
     pdf_file = f'{pdf_file}.pdf'
+    filename = f"schedule_for_{user_data.get('corpus', '').lower()}_{user_data.get('floor', '')}.pdf"
+    caption = tr(context, "caption")
+    cache_key = user_data.get("cache_key")
+
+    # resend by file_id when this schedule has been uploaded before
+    file_id = file_ids.get(cache_key) if cache_key else None
+    if file_id:
+        try:
+            with metrics.timer("resend"):
+                await update.effective_message.reply_document(file_id, filename=filename, caption=caption, reply_markup=reply_markup)
+            logging.info(f"PDF resent by file_id: {cache_key}")
+            return True
+        except Exception as e:
+            logging.warning(f"Resending by file_id failed, uploading instead: {str(e)}")
+            file_ids.discard(cache_key)
+            if schedule_cache.get_bytes(cache_key) is None and not os.path.exists(pdf_file):
+                await update.effective_message.reply_text(tr(context, "expired"))
+                return False
 
     # Log the file being sent
     logging.info(f"Attempting to send file: {pdf_file}")
 
     try:
-        with open(pdf_file, 'rb') as file:
-            await update.message.reply_document(
-                file,
-                filename=os.path.basename(f'{pdf_file}'),
-                caption="Here is your room schedule. Let us know if you need further assistance!"
-            )
+        data = schedule_cache.get_bytes(cache_key) if cache_key else None
+        if data is not None:
+            # rendered in memory: straight from the buffer, no file involved
+            with metrics.timer("upload"):
+                message = await update.effective_message.reply_document(data, filename=filename, caption=caption, reply_markup=reply_markup)
+            logging.info(f"PDF sent from memory: {cache_key}")
+        else:
+            with open(pdf_file, 'rb') as file, metrics.timer("upload"):
+                message = await update.effective_message.reply_document(file, filename=filename, caption=caption, reply_markup=reply_markup)
             logging.info(f"PDF file sent successfully: {pdf_file}")
+        if cache_key and message.document:
+            file_ids.set(cache_key, message.document.file_id)
+        return True
     except Exception as e:
         logging.error(f"Error while sending the PDF: {str(e)}")
-        await update.message.reply_text("An error occurred while sending the PDF.")
+        await update.effective_message.reply_text(tr(context, "send_error"))
+        return False
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    await update.message.reply_text("Process canceled. Goodbye!")
+    drop_speculative_render(update.effective_user.id)
+    await update.message.reply_text(tr(context, "cancelled"))
     return ConversationHandler.END
 
+def rotation_index(user_data, until):
+    """
+    Rotation of the user's floor up to until, as its schedules continue it.
+    """
+    language = get_language(user_data.get("language")).code
+    return floor_rotation(user_data["corpus"], user_data["floor"], user_data["num_rooms"], until, language)
+
+async def my_next(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /mynext [N]: list the user's next N duty dates without generating a PDF.
+    """
+    user_data = context.user_data
+    if "num_rooms" not in user_data or "your_room_number" not in user_data:
+        await update.message.reply_text(tr(context, "no_floor"))
+        return
+
+    count = 5
+    if context.args:
+        if not context.args[0].isdigit() or not 0 < int(context.args[0]) <= 50:
+            await update.message.reply_text(tr(context, "mynext_usage"))
+            return
+        count = int(context.args[0])
+
+    room = user_data["your_room_number"]
+    now = datetime.now()
+    # holidays push the duties further out: widen the horizon until it covers the last one
+    until = now + timedelta(days=count * user_data["num_rooms"] + 1)
+    while True:
+        dates = rotation_index(user_data, until).next_duties(room, count, after=now)
+        if dates[-1] < until.date():
+            break
+        until = datetime.combine(dates[-1], datetime.min.time()) + timedelta(days=user_data["num_rooms"] + 1)
+    language = user_language(context)
+    lines = [f"{language.weekday(day)} {day.strftime('%d.%m.%Y')}" for day in dates]
+    await update.message.reply_text(
+        language.text("next_duties", room=room_label(user_data['corpus'], user_data['floor'], room)) + "\n" + "\n".join(lines)
+    )
+
+async def on_duty(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /onduty [dd.mm.yyyy]: show which room is on duty on a date (default: today).
+    """
+    user_data = context.user_data
+    if "num_rooms" not in user_data:
+        await update.message.reply_text(tr(context, "no_floor"))
+        return
+
+    try:
+        day = datetime.strptime(context.args[0], '%d.%m.%Y') if context.args else datetime.now()
+    except ValueError:
+        await update.message.reply_text(tr(context, "onduty_usage"))
+        return
+
+    room = rotation_index(user_data, day + timedelta(days=1)).room_on(day)
+    if room is None:
+        await update.message.reply_text(tr(context, "nobody_on_duty", date=day.strftime('%d.%m.%Y')))
+        return
+    await update.message.reply_text(tr(
+        context, "on_duty", weekday=user_language(context).weekday(day), date=day.strftime('%d.%m.%Y'),
+        room=room_label(user_data['corpus'], user_data['floor'], room),
+    ))
+
+async def choose_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /language: switch the language of the bot and of the schedules it sends.
+    """
+    keyboard = [[InlineKeyboardButton(language.name, callback_data=f'lang:{code}')] for code, language in LANGUAGES.items()]
+    await update.message.reply_text(tr(context, "choose_language"), reply_markup=InlineKeyboardMarkup(keyboard))
+
+async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    language = get_language(query.data.split(":", 1)[1])
+    context.user_data["language"] = language.code
+
+    # /again and the nightly warm-up read the saved profile
+    user_id = update.effective_user.id
+    profile = store.get_profile(user_id)
+    if profile:
+        profile["language"] = language.code
+        store.save_profile(user_id, profile)
+    await query.message.reply_text(language.text("language_set"))
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /stats (admins only): per-stage timings and counters of this bot process.
+    """
+    if update.effective_user.id not in ADMIN_IDS:
+        return
+    await update.message.reply_text(
+        f"{metrics.summary()}\n"
+        f"render queue: {render_queue.queued()} waiting\n"
+        f"schedule cache: {schedule_cache.hits} hits, {schedule_cache.misses} misses"
+    )
+
+async def serve_metrics(reader, writer):
+    """
+    Minimal HTTP handler answering every request with the Prometheus text format.
+    """
+    try:
+        await reader.readuntil(b"\r\n\r\n")
+        body = metrics.prometheus().encode("utf-8")
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(body) + body
+        )
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def prewarm_next_month(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Nightly job: shortly before a new month, render next month's schedules for every
+    known floor so the month-start rush is served from the cache.
+    """
+    today = datetime.now()
+    next_month = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+    if (next_month - today).days >= PREWARM_DAYS_BEFORE:
+        return
+
+    start_date = next_month.strftime('%d.%m.%Y')
+    configurations = store.schedule_configurations()
+    if BUILDING_FILE:
+        month_length = calendar.monthrange(next_month.year, next_month.month)[1]
+        for corpus, floor, num_rooms in building_schedules(load_building(BUILDING_FILE)):
+            configurations.add((corpus, floor, num_rooms, month_length, DEFAULT_LANGUAGE))
+
+    rendered = 0
+    for corpus, floor, num_rooms, num_days, language in sorted(configurations):
+        room = room_due_on(corpus, floor, num_rooms, start_date, language)
+        cache_key = schedule_key(corpus, floor, num_rooms, start_date, num_days, language, room)
+        if file_ids.get(cache_key) or schedule_cache.contains(cache_key):
+            continue
+        try:
+            # one job at a time, so residents' own requests are never stuck behind the warm-up
+            await render_queue.submit(
+                generate_pdf, corpus, floor, num_rooms, None, "", start_date, num_days, schedule_cache.path(cache_key),
+                None, language, room,
+            )
+            rendered += 1
+        except QueueFullError:
+            logging.info("Render queue is busy, postponing the rest of the warm-up")
+            break
+        except Exception as e:
+            logging.error(f"Error pre-rendering {corpus} floor {floor}: {str(e)}")
+
+    if rendered:
+        schedule_cache.evict()
+    logging.info(f"Pre-rendered {rendered} schedule(s) starting {start_date}")
+
+async def expire_schedules(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Nightly job: forget file_ids and export parameters of schedules not sent for as
+    long as the cache keeps files, so the store does not grow with every schedule.
+    """
+    schedule_cache.evict()
+    max_age = CACHE_MAX_AGE_DAYS * 24 * 3600
+    expired = file_ids.prune(max_age) + schedule_exports.prune(max_age)
+    if expired:
+        logging.info(f"Expired {expired} stored file_id(s) and export(s)")
+
+async def post_init(application):
+    # build this and next year's holidays once, before the first request needs them
+    this_year = datetime.now().year
+    for country in {holiday_country(code) for code in LANGUAGES}:
+        holiday_index(country).ensure_years([this_year, this_year + 1])
+    await render_queue.start()
+    if METRICS_PORT:
+        global metrics_server
+        metrics_server = await asyncio.start_server(serve_metrics, METRICS_LISTEN, int(METRICS_PORT))
+        logging.info(f"Serving metrics on {METRICS_LISTEN}:{METRICS_PORT}")
+
+async def post_shutdown(application):
+    # let PDFs that are already queued or rendering finish before exiting
+    await render_queue.shutdown(drain_timeout=SHUTDOWN_DRAIN_SECONDS)
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+
 def main():
-    application = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+    application = (
+        ApplicationBuilder()
+        .token(TELEGRAM_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .persistence(
+            StorePersistence(store) if PERSISTENCE == "store" else PicklePersistence(filepath=CONVERSATION_STATE_PATH)
+        )
+        # handlers await their render job, so they must not block other users' updates
+        .concurrent_updates(True)
+        .build()
+    )
 
     conv_handler = ConversationHandler(
-        entry_points=[CommandHandler("start", start)],
+        entry_points=[CommandHandler("start", start), CommandHandler("again", again), CommandHandler("extend", extend)],
         states={
             CORPUS: [CallbackQueryHandler(get_corpus)],
             FLOOR: [CallbackQueryHandler(get_floor)],
-            NUM_ROOMS: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_num_rooms)],
+            NUM_ROOMS: [
+                MessageHandler(filters.TEXT & ~filters.COMMAND, get_num_rooms),
+                CallbackQueryHandler(get_saved_num_rooms, pattern=r'^rooms:\d+$'),
+            ],
             USER_ROOM: [CallbackQueryHandler(get_user_room)],
             USER_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_user_name)],
             DAYS_AHEAD: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_days_ahead)],
-            CONFIRMATION: [
-                CallbackQueryHandler(confirm, pattern='^generate_schedule$'),
-                CallbackQueryHandler(send_pdf_callback, pattern='^send_pdf$'),
-            ],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        name="schedule_conversation",
+        persistent=True,
     )
 
+    # ahead of the conversation, whose callback handlers would otherwise take the button presses
+    application.add_handler(CallbackQueryHandler(set_language, pattern=r'^lang:'))
+    application.add_handler(CallbackQueryHandler(export_schedule, pattern=r'^export:'))
     application.add_handler(conv_handler)
-    application.run_polling()
+    application.add_handler(CallbackQueryHandler(confirm, pattern='^generate_schedule$'))
+    application.add_handler(CallbackQueryHandler(send_pdf_callback, pattern='^send_pdf'))
+    application.job_queue.run_daily(prewarm_next_month, time=dt_time(hour=PREWARM_HOUR))
+    application.job_queue.run_daily(expire_schedules, time=dt_time(hour=PREWARM_HOUR))
+    application.add_handler(CommandHandler("mynext", my_next))
+    application.add_handler(CommandHandler("onduty", on_duty))
+    application.add_handler(CommandHandler("stats", stats))
+    application.add_handler(CommandHandler("language", choose_language))
+    if WEBHOOK_URL:
+        logging.info(f"Starting webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+        )
+    else:
+        application.run_polling()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Fair-load duty assignment.
+
+The plain rotation hands out duties in room order, so whichever rooms happen to
+line up with Saturdays and Sundays keep getting the weekends, and every holiday
+shifts that pattern onto other rooms. balanced_duties() instead gives each working
+day to the room with the fewest duties of that kind (weekend or weekday) so far,
+and leaves out residents who are away.
+
+Every room sits in one heap per kind, keyed by
+(duties of that kind, all duties, day of last duty, rotation order), so a day
+costs O(log R) for R rooms. Entries are invalidated lazily, and the whole
+schedule takes O(D log R) for D days.
+"""
+from heapq import heapify, heappop, heappush
+from datetime import datetime, timedelta
+from statistics import pvariance
+
+from schedule_engine import Duty, parse_start_date
+
+WEEKDAY, WEEKEND = 0, 1
+
+
+def is_weekend(day):
+    return day.weekday() >= 5
+
+
+def _as_date(day):
+    return day.date() if isinstance(day, datetime) else day
+
+
+def balanced_duties(start_date, num_days, num_rooms, holidays=None, your_room_number=None, username="", first_room=1, exclusions=None, min_rest=None):
+    """
+    Lazily yield one Duty per day like iter_duties, with rooms chosen for fairness.
+
+    exclusions maps a room to the dates its residents are away; those rooms are
+    skipped on those days. A room is not given another duty within min_rest days
+    (default: a third of the rotation) of its last one while a rested room is
+    present, so residents coming back catch up gradually; when every room present
+    has had a duty that recently, the fairest of them takes the day anyway. Ties go
+    to the room that has waited longest, then to rotation order from first_room.
+    On a day when every room is away, the Duty has neither a room nor a holiday.
+    """
+    start_date = parse_start_date(start_date)
+    if min_rest is None:
+        min_rest = max(1, num_rooms // 3)
+    rooms = range(1, num_rooms + 1)
+    away = {room: {_as_date(day) for day in days} for room, days in (exclusions or {}).items()}
+    counts = {room: [0, 0] for room in rooms}
+    last = dict.fromkeys(rooms, -num_rooms - min_rest)
+    order = {room: (room - first_room) % num_rooms for room in rooms}
+    # bumped on every assignment, so older heap entries of the room can be told apart
+    stamp = dict.fromkeys(rooms, 0)
+
+    def entry(room, kind):
+        return (counts[room][kind], sum(counts[room]), last[room], order[room], stamp[room], room)
+
+    heaps = [[entry(room, kind) for room in rooms] for kind in (WEEKDAY, WEEKEND)]
+    for heap in heaps:
+        heapify(heap)
+
+    for i in range(num_days):
+        current_date = start_date + timedelta(days=i)
+
+        # holidays do not consume a room's turn
+        if holidays is not None and current_date in holidays:
+            yield Duty(current_date, None, holidays.get(current_date), "")
+            continue
+
+        kind = WEEKEND if is_weekend(current_date) else WEEKDAY
+        room = _pick(heaps[kind], i, _as_date(current_date), stamp, last, away, min_rest)
+        if room is None:
+            # everyone is away: the day stays empty, told apart from holidays by holiday=None
+            yield Duty(current_date, None, None, "")
+            continue
+
+        counts[room][kind] += 1
+        last[room] = i
+        stamp[room] += 1
+        for other_kind in (WEEKDAY, WEEKEND):
+            heappush(heaps[other_kind], entry(room, other_kind))
+
+        resident = username if room == your_room_number else ""
+        yield Duty(current_date, room, None, resident)
+
+
+def _pick(heap, day_index, day, stamp, last, away, min_rest):
+    # pop until a room that is here and has rested enough turns up; the rooms passed
+    # over go back into the heap, minus the one chosen
+    passed = []
+    chosen = None
+    tired = None
+    while heap:
+        candidate = heappop(heap)
+        room = candidate[-1]
+        if candidate[-2] != stamp[room]:
+            continue  # outdated entry of a room that has been assigned since
+        passed.append(candidate)
+        if day in away.get(room, ()):
+            continue
+        if day_index - last[room] <= min_rest:
+            if tired is None:
+                tired = candidate
+            continue
+        chosen = candidate
+        break
+
+    chosen = chosen or tired
+    for candidate in passed:
+        if candidate is not chosen:
+            heappush(heap, candidate)
+    return None if chosen is None else chosen[-1]
+
+
+def duty_counts(duties, num_rooms):
+    """
+    (weekday counts, weekend counts) per room; index 0 is room 1.
+    """
+    counts = ([0] * num_rooms, [0] * num_rooms)
+    for duty in duties:
+        if duty.room is not None:
+            counts[WEEKEND if is_weekend(duty.date) else WEEKDAY][duty.room - 1] += 1
+    return counts
+
+
+def load_variance(duties, num_rooms):
+    """
+    Population variance of the weekday and of the weekend duty counts across rooms.
+    """
+    weekday_counts, weekend_counts = duty_counts(duties, num_rooms)
+    return pvariance(weekday_counts), pvariance(weekend_counts)
@@ -0,0 +1,125 @@
+"""
+Machine-readable exports of a schedule: CSV, iCalendar and JSON.
+
+They are built from the same duties the PDF renderers use, straight into bytes, so
+an export takes milliseconds and needs neither LaTeX nor the render queue.
+"""
+import io
+import csv
+import json
+from datetime import datetime, timedelta, timezone
+
+from languages import DEFAULT_LANGUAGE, get_language
+from schedule_engine import room_label
+
+
+def export_csv(duties, corpus, floor, language=DEFAULT_LANGUAGE):
+    """
+    One row per day: date (ISO), weekday, room, holiday, note (set on days when
+    every resident is away).
+    """
+    language = get_language(language)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["date", "weekday", "room", "holiday", "note"])
+    for duty in duties:
+        room = room_label(corpus, floor, duty.room) if duty.room is not None else ""
+        writer.writerow([
+            duty.date.strftime('%Y-%m-%d'), language.weekday(duty.date), room, duty.holiday or "", _note(duty, language) or "",
+        ])
+    # with a BOM, spreadsheet programs open non-ASCII weekday names correctly
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+def export_json(duties, corpus, floor, language=DEFAULT_LANGUAGE):
+    language = get_language(language)
+    rows = [
+        {
+            "date": duty.date.strftime('%Y-%m-%d'),
+            "weekday": language.weekday(duty.date),
+            "room": room_label(corpus, floor, duty.room) if duty.room is not None else None,
+            "room_number": duty.room,
+            "holiday": duty.holiday,
+            "note": _note(duty, language),
+        }
+        for duty in duties
+    ]
+    return json.dumps({"corpus": corpus, "floor": floor, "duties": rows}, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def export_ics(duties, corpus, floor, room, language=DEFAULT_LANGUAGE, stamp=None):
+    """
+    iCalendar file with an all-day event for each duty of the given room only.
+    Raises ValueError without a room.
+    """
+    if room is None:
+        raise ValueError("The calendar export needs the resident's room")
+    language = get_language(language)
+    label = room_label(corpus, floor, room)
+    summary = _escape(language.text("duty_event", room=label))
+    stamp = (stamp or datetime.now(timezone.utc)).strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//DormOptimization//Kitchen Cleaning Schedule//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(language.text('title'))} {label}",
+    ]
+    for duty in duties:
+        if duty.room != room:
+            continue
+        day = duty.date.strftime('%Y%m%d')
+        lines += [
+            "BEGIN:VEVENT",
+            # stable per room and day, so re-importing updates events instead of duplicating them
+            f"UID:{corpus}-{floor}-{room}-{day}@dorm-bot",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{day}",
+            f"DTEND;VALUE=DATE:{(duty.date + timedelta(days=1)).strftime('%Y%m%d')}",
+            f"SUMMARY:{summary}",
+            "TRANSP:TRANSPARENT",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(_fold(line) + "\r\n" for line in lines).encode("utf-8")
+
+
+def _note(duty, language):
+    # neither a room nor a holiday: nobody could take the day
+    if duty.room is None and duty.holiday is None:
+        return language.text("everyone_away")
+    return None
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line, limit=75):
+    # RFC 5545: lines longer than 75 octets continue on the next line after a space
+    parts = []
+    current = ""
+    for char in line:
+        if len((current + char).encode("utf-8")) > limit:
+            parts.append(current)
+            current = " "
+        current += char
+    parts.append(current)
+    return "\r\n".join(parts)
+
+
+FORMATS = ("csv", "ics", "json")
+
+
+def export(fmt, duties, corpus, floor, room, language=DEFAULT_LANGUAGE):
+    """
+    The schedule in one of FORMATS as bytes; the calendar only holds room's duties.
+    """
+    if fmt == "csv":
+        return export_csv(duties, corpus, floor, language)
+    if fmt == "ics":
+        return export_ics(duties, corpus, floor, room, language)
+    if fmt == "json":
+        return export_json(duties, corpus, floor, language)
+    raise ValueError(f"Unknown export format {fmt!r}, expected one of: {', '.join(FORMATS)}")
@@ -0,0 +1,82 @@
+import logging
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+import holidays
+
+
+class HolidayIndex:
+    """
+    Public holidays of one country, built once and extended year by year on demand.
+
+    Membership is a dict lookup; the sorted list of dates supports range queries.
+    An empty country code gives an index without holidays.
+    """
+
+    def __init__(self, country):
+        self.country = country
+        self.names = {}
+        self.sorted_dates = []
+        self.years = set()
+        self._lock = threading.Lock()
+
+    def ensure_years(self, years):
+        """
+        Make sure every year in years is loaded.
+        """
+        missing = sorted(set(years) - self.years)
+        if not missing or not self.country:
+            return
+        with self._lock:
+            missing = sorted(set(missing) - self.years)
+            if not missing:
+                return
+            calendar = holidays.CountryHoliday(self.country, years=missing)
+            names = dict(self.names)
+            names.update(calendar.items())
+            # swap in complete structures so readers never see a half-built index
+            self.sorted_dates = sorted(names)
+            self.names = names
+            self.years = self.years | set(missing)
+            logging.info(f"Loaded {self.country} holidays for {missing[0]}-{missing[-1]}")
+
+    def ensure_range(self, start, end):
+        self.ensure_years(range(start.year, end.year + 1))
+
+    def get(self, day, default=None):
+        if isinstance(day, datetime):
+            day = day.date()
+        if day.year not in self.years:
+            self.ensure_years([day.year])
+        return self.names.get(day, default)
+
+    def __contains__(self, day):
+        return self.get(day) is not None
+
+    def between(self, start, end):
+        """
+        Sorted holiday dates with start <= date < end.
+        """
+        if isinstance(start, datetime):
+            start = start.date()
+        if isinstance(end, datetime):
+            end = end.date()
+        self.ensure_range(start, end)
+        dates = self.sorted_dates
+        return dates[bisect_left(dates, start):bisect_left(dates, end)]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def holiday_index(country):
+    """
+    Process-wide HolidayIndex for the given country code.
+    """
+    index = _indexes.get(country)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(country, HolidayIndex(country))
+    return index
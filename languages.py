@@ -0,0 +1,182 @@
+"""
+Languages the bot and the schedules can be produced in.
+
+Each language bundles the bot's messages, the schedule's title and header, the
+weekday names, extra LaTeX preamble lines and the default holiday calendar.
+Weekday names come from the tables here rather than strftime('%A'), which
+depends on the process-wide locale and so cannot serve two languages at once.
+"""
+
+
+class Language:
+    def __init__(self, code, name, holiday_country, weekdays, strings, latex_preamble=(), latin1=True):
+        self.code = code
+        # name of the language in the language itself, for the /language buttons
+        self.name = name
+        self.holiday_country = holiday_country
+        self.weekdays = weekdays
+        self.strings = strings
+        self.latex_preamble = latex_preamble
+        # whether every string fits Latin-1, which the native PDF renderer is limited to
+        self.latin1 = latin1
+
+    def weekday(self, day):
+        return self.weekdays[day.weekday()]
+
+    def text(self, key, **kwargs):
+        """
+        Message key formatted with kwargs, falling back to English for missing keys.
+        """
+        template = self.strings.get(key)
+        if template is None:
+            template = LANGUAGES[DEFAULT_LANGUAGE].strings[key]
+        return template.format(**kwargs) if kwargs else template
+
+
+ENGLISH = Language(
+    code="en",
+    name="English",
+    holiday_country="DK",
+    weekdays=("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"),
+    strings={
+        "title": "Kitchen Cleaning Schedule",
+        "building_title": "Kitchen Cleaning Schedule, {corpus} floor {floor}",
+        "header": ("Room Number", "Date (Day of the Week, dd.mm.yy)", "Checkin"),
+        "welcome": "Welcome to the Dorm Management Bot! Let's set up your room schedule.\n\nPlease select the corpus:",
+        "corpus_selected": "You selected corpus: {corpus}.",
+        "ask_floor": "Now, enter the floor number:",
+        "saved_rooms": "{num_rooms} rooms",
+        "floor_selected": "You selected floor number: {floor}. How many rooms are on this floor?",
+        "invalid_rooms": "Please enter a valid number of rooms.",
+        "ask_room": "Which room number is yours?",
+        "room_selected": "You selected room number: {room}. What is your name?",
+        "ask_days": "How many days ahead would you like to generate the schedule for?",
+        "invalid_days": "Please enter a valid number of days.",
+        "too_many_days": "Schedules can cover at most {max_days} days. Please enter a smaller number.",
+        "summary": (
+            "Thank you! Here is the information you provided:\n"
+            "- Corpus: {corpus}\n"
+            "- Floor: {floor}\n"
+            "- Number of Rooms: {num_rooms}\n"
+            "- Your Room: {your_room_number}\n"
+            "- Your Name: {username}\n"
+            "- Days Ahead: {num_days}"
+        ),
+        "no_details": "I don't have your details anymore. Type /start to set up your schedule.",
+        "no_profile": "I don't have a saved schedule for you yet. Type /start to set one up.",
+        "already_preparing": "Your schedule is already being prepared.",
+        "rate_limited": "You are requesting schedules too quickly. Please try again in {seconds} seconds.",
+        "generating": "Generating your schedule...",
+        "queued": "Your schedule is #{position} in the queue. It will be generated shortly.",
+        "rendering": "Rendering your schedule...",
+        "rendering_page": "Rendering page {page}/{pages}...",
+        "sending": "Sending your schedule...",
+        "busy": "The bot is busy generating other schedules right now. Please try again in a minute.",
+        "render_error": "An error occurred while generating the PDF. Please try again.",
+        "no_pdf": "Error: No schedule PDF has been generated yet. Type /again to create it.",
+        "caption": "Here is your room schedule. Let us know if you need further assistance!",
+        "expired": "The schedule has expired. Type /again to generate it again.",
+        "send_error": "An error occurred while sending the PDF.",
+        "restart_hint": "If you want to start the process again, type /start.",
+        "cancelled": "Process canceled. Goodbye!",
+        "no_floor": "I don't know your floor yet. Type /start to set it up first.",
+        "mynext_usage": "Usage: /mynext [number of dates, 1-50]",
+        "next_duties": "Next duty dates for room {room}:",
+        "onduty_usage": "Usage: /onduty [dd.mm.yyyy]",
+        "extend_usage": "Usage: /extend [number of days, 1-{max_days}]",
+        "nobody_on_duty": "Nobody is on duty on {date}.",
+        "on_duty": "On {weekday} {date} room {room} is on duty.",
+        "choose_language": "Choose your language:",
+        "language_set": "Language set to English.",
+        "export_csv": "CSV",
+        "export_ics": "Calendar (.ics)",
+        "export_json": "JSON",
+        "everyone_away": "Everyone away",
+        "export_no_room": "The calendar holds your own duties, but your room is not on this floor. Type /start to set up your room.",
+        "duty_event": "Kitchen cleaning, room {room}",
+    },
+)
+
+UKRAINIAN = Language(
+    code="uk",
+    name="Українська",
+    holiday_country="UA",
+    weekdays=("Понеділок", "Вівторок", "Середа", "Четвер", "П'ятниця", "Субота", "Неділя"),
+    strings={
+        "title": "Розклад прибирання кухні",
+        "building_title": "Розклад прибирання кухні, {corpus}, поверх {floor}",
+        "header": ("Номер кімнати", "Дата (День тижня, дд.мм.рр)", "Перевірка"),
+        "welcome": "Ласкаво просимо до бота управління гуртожитком! Давайте налаштуємо ваш графік.\n\nБудь ласка, виберіть корпус:",
+        "corpus_selected": "Ви вибрали корпус: {corpus}.",
+        "ask_floor": "Тепер виберіть номер поверху:",
+        "saved_rooms": "Кімнат: {num_rooms}",
+        "floor_selected": "Ви вибрали поверх номер: {floor}. Скільки кімнат на цьому поверсі?",
+        "invalid_rooms": "Будь ласка, введіть дійсну кількість кімнат.",
+        "ask_room": "Який номер вашої кімнати?",
+        "room_selected": "Ви вибрали номер кімнати: {room}. Як вас звати?",
+        "ask_days": "На скільки днів уперед ви хочете створити графік?",
+        "invalid_days": "Будь ласка, введіть дійсну кількість днів.",
+        "too_many_days": "Графік може охоплювати не більше {max_days} днів. Будь ласка, введіть менше число.",
+        "summary": (
+            "Дякуємо! Ось інформація, яку ви надали:\n"
+            "- Корпус: {corpus}\n"
+            "- Поверх: {floor}\n"
+            "- Кількість кімнат: {num_rooms}\n"
+            "- Ваша кімната: {your_room_number}\n"
+            "- Ваше ім'я: {username}\n"
+            "- Днів уперед: {num_days}"
+        ),
+        "no_details": "Я більше не маю ваших даних. Введіть /start, щоб налаштувати графік.",
+        "no_profile": "У мене ще немає збереженого графіка для вас. Введіть /start, щоб налаштувати його.",
+        "already_preparing": "Ваш графік уже готується.",
+        "rate_limited": "Ви запитуєте графіки надто часто. Спробуйте знову через {seconds} с.",
+        "generating": "Створюємо ваш графік...",
+        "queued": "Ваш графік №{position} у черзі. Його буде створено найближчим часом.",
+        "rendering": "Формуємо ваш графік...",
+        "rendering_page": "Формуємо сторінку {page}/{pages}...",
+        "sending": "Надсилаємо ваш графік...",
+        "busy": "Бот зараз зайнятий створенням інших графіків. Спробуйте ще раз за хвилину.",
+        "render_error": "Під час створення PDF сталася помилка. Спробуйте ще раз.",
+        "no_pdf": "Помилка: PDF-файл графіка ще не створено. Введіть /again, щоб створити його.",
+        "caption": "Ось розклад вашої кімнати. Повідомте нас, якщо вам потрібна додаткова допомога!",
+        "expired": "Термін дії графіка минув. Введіть /again, щоб створити його знову.",
+        "send_error": "Під час надсилання PDF сталася помилка.",
+        "restart_hint": "Якщо ви хочете розпочати знову, введіть /start.",
+        "cancelled": "Процес скасовано. До побачення!",
+        "no_floor": "Я ще не знаю ваш поверх. Спочатку введіть /start, щоб налаштувати його.",
+        "mynext_usage": "Використання: /mynext [кількість дат, 1-50]",
+        "next_duties": "Наступні чергування кімнати {room}:",
+        "onduty_usage": "Використання: /onduty [дд.мм.рррр]",
+        "extend_usage": "Використання: /extend [кількість днів, 1-{max_days}]",
+        "nobody_on_duty": "{date} ніхто не чергує.",
+        "on_duty": "{weekday} {date} чергує кімната {room}.",
+        "choose_language": "Оберіть мову:",
+        "language_set": "Мову змінено на українську.",
+        "export_csv": "CSV",
+        "export_ics": "Календар (.ics)",
+        "export_json": "JSON",
+        "everyone_away": "Усі відсутні",
+        "export_no_room": "Календар містить лише ваші чергування, але вашої кімнати немає на цьому поверсі. Введіть /start, щоб вказати свою кімнату.",
+        "duty_event": "Прибирання кухні, кімната {room}",
+    },
+    latex_preamble=(
+        r'\usepackage[utf8]{inputenc}',  # ensure Ukrainian characters are supported
+        r'\usepackage[T2A]{fontenc}',  # load Cyrillic font encoding
+        r'\usepackage[ukrainian]{babel}',  # use Ukrainian language support
+    ),
+    latin1=False,
+)
+
+LANGUAGES = {language.code: language for language in (ENGLISH, UKRAINIAN)}
+DEFAULT_LANGUAGE = "en"
+
+
+def get_language(code=None):
+    """
+    The registered language for code (e.g. "uk" or Telegram's "uk-UA"), or the default one.
+    """
+    if code:
+        language = LANGUAGES.get(code.split("-", 1)[0].lower())
+        if language is not None:
+            return language
+    return LANGUAGES[DEFAULT_LANGUAGE]
@@ -0,0 +1,96 @@
+import os
+import hashlib
+import logging
+import subprocess
+import threading
+from functools import lru_cache
+
+FORMAT_DIR = os.getenv("LATEX_FORMAT_DIR", "latex_formats")
+USE_LATEX_FORMAT = os.getenv("LATEX_FORMAT", "1") == "1"
+
+_lock = threading.Lock()
+_failed = set()
+
+
+def preamble_of(doc):
+    """
+    LaTeX source of the document up to (not including) \\begin{document}.
+    """
+    source = doc.dumps()
+    return source[:source.index(r'\begin{document}')]
+
+
+@lru_cache(maxsize=None)
+def pdflatex_version():
+    """
+    First line of `pdflatex --version`, or "" if it cannot be run.
+    """
+    try:
+        result = subprocess.run(["pdflatex", "--version"], check=True, capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return result.stdout.partition("\n")[0]
+
+
+def build_format(preamble, directory=FORMAT_DIR):
+    """
+    Precompile preamble into a pdflatex format file with mylatexformat and return its
+    path without extension, or None if it cannot be built. Formats are named by the
+    hash of their preamble and the pdflatex version, so each distinct preamble is
+    compiled only once, and a TeX upgrade does not load a format it cannot read.
+    """
+    digest = hashlib.sha256(f"{pdflatex_version()}\n{preamble}".encode("utf-8")).hexdigest()[:16]
+    name = "preamble_" + digest
+    directory = os.path.abspath(directory)
+    fmt_path = os.path.join(directory, name)
+    if name in _failed:
+        return None
+    if os.path.exists(f"{fmt_path}.fmt"):
+        return fmt_path
+
+    with _lock:
+        if os.path.exists(f"{fmt_path}.fmt"):
+            return fmt_path
+        os.makedirs(directory, exist_ok=True)
+        source_file = os.path.join(directory, f"{name}.tex")
+        with open(source_file, "w", encoding="utf-8") as file:
+            file.write(preamble)
+            file.write("\\begin{document}\n\\end{document}\n")
+
+        logging.info(f"Building LaTeX format: {fmt_path}.fmt")
+        try:
+            subprocess.run(
+                [
+                    "pdflatex", "-ini", "-interaction=nonstopmode",
+                    f"-jobname={name}", f"-output-directory={directory}",
+                    "&pdflatex", "mylatexformat.ltx", source_file,
+                ],
+                cwd=directory,
+                check=True,
+                capture_output=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            logging.warning(f"Could not build LaTeX format, compiling without it: {str(e)}")
+            _failed.add(name)
+            return None
+    return fmt_path
+
+
+def compile_tex(output_filename, preamble, format_dir=FORMAT_DIR, use_format=USE_LATEX_FORMAT):
+    """
+    Run a single pdflatex pass on f"{output_filename}.tex", which must start with
+    preamble, loading the preamble from a precompiled format when possible.
+    """
+    fmt_path = build_format(preamble, format_dir) if use_format else None
+    output_filename = os.path.abspath(output_filename)
+    command = ["pdflatex", "-interaction=nonstopmode", f"{output_filename}.tex"]
+    cwd = os.path.dirname(output_filename)
+    if fmt_path is not None:
+        try:
+            subprocess.run(command[:2] + [f"-fmt={fmt_path}"] + command[2:], cwd=cwd, check=True, capture_output=True)
+            return
+        except subprocess.CalledProcessError as e:
+            # e.g. a format that is corrupt or does not match this pdflatex: stop using it
+            logging.warning(f"Compiling with LaTeX format {fmt_path}.fmt failed, retrying without it: {str(e)}")
+            _failed.add(os.path.basename(fmt_path))
+    subprocess.run(command, cwd=cwd, check=True, capture_output=True)
@@ -1,12 +1,15 @@
 from pylatex import Document, LongTable, NoEscape
-from datetime import datetime, timedelta
-import holidays
+from datetime import datetime
+from holiday_index import holiday_index
+from languages import get_language
+from schedule_engine import iter_duties, room_label
 
-def generate_pdf_table(corpus, floor, number_after_corpus, num_rooms, your_room_number, username, start_date, num_days):
+def generate_pdf_table(corpus, floor, number_after_corpus, num_rooms, your_room_number, username, start_date, num_days, language="en"):
     # generates a PDF file with a table that maps room numbers to corresponding dates and residents
-    
-    # getting holidays using the holidays library
-    dk_holidays = holidays.CountryHoliday('DK', years=[2024, 2025])
+    language = get_language(language)
+
+    # getting the language's public holidays
+    country_holidays = holiday_index(language.holiday_country)
     
     # parsing the start date
     start_date = datetime.strptime(start_date, '%d.%m.%Y')
@@ -20,58 +23,38 @@ def generate_pdf_table(corpus, floor, number_after_corpus, num_rooms, your_room_
     doc.preamble.append(NoEscape(r'\setlength{\parindent}{0pt}'))
     doc.preamble.append(NoEscape(r'\renewcommand{\familydefault}{\sfdefault}'))
     doc.preamble.append(NoEscape(r'\pagenumbering{gobble}'))  # remove page numbering
+    for line in language.latex_preamble:
+        doc.preamble.append(NoEscape(line))
 
     # setting font size for the entire document
     doc.append(NoEscape(r'\fontsize{14pt}{16pt}\selectfont'))
 
     # centering the table itself
     doc.append(NoEscape(r'\begin{center}'))
-    doc.append(NoEscape(r'Kitchen Cleaning for December'))
+    doc.append(language.text("title"))
 
     # creating a longtable for multi-page support
     with doc.create(LongTable(r'|p{0.3\textwidth}|p{0.55\textwidth}|p{0.15\textwidth}|')) as table:
         table.add_hline()
-        table.add_row(["Room Number", "Date (Day of the Week, dd.mm.yy)", "Checkin"])
+        table.add_row(list(language.text("header")))
         table.add_hline()
         table.end_table_header()
         table.add_hline()
         
         # adding table rows
-        room_number_index = 1
-        for i in range(num_days):
-            # calculating the current date
-            current_date = start_date + timedelta(days=i)
-            
-            # check if the current date is a holiday
-            if current_date in dk_holidays:
-                holiday_name = dk_holidays.get(current_date)
-                # add a row for holidays with the holiday name
-                holidate = NoEscape(f"{current_date.strftime('%A')} \\hfill {current_date.strftime('%d.%m.%Y')}")
-                table.add_row([holiday_name, holidate, ""])
-                table.add_hline()
-                continue
-            
-            # calculating the room number
-            room_number = (
-                f"{corpus}.{floor}.{number_after_corpus}{room_number_index}"
-                if room_number_index < 10
-                else f"{corpus}.{floor}.{room_number_index}"
-            )
-            
-            # checking if the current room is the user's room
-            resident = username if room_number_index == your_room_number else ""
-            
-            # formatting the date with \hfill
-            day_of_week = current_date.strftime('%A')
-            date = current_date.strftime('%d.%m.%Y')
+        for duty in iter_duties(start_date, num_days, num_rooms, country_holidays, your_room_number, username):
+            # formatting the date with \hfill; weekday names come from the language, not the locale
+            day_of_week = language.weekday(duty.date)
+            date = duty.date.strftime('%d.%m.%Y')
             formatted_date = NoEscape(f"{day_of_week}\\hfill {date}")
-            
-            # adding a row to the table
-            table.add_row([room_number, formatted_date, ""])
+
+            if duty.room is None:
+                # add a row for holidays with the holiday name
+                table.add_row([duty.holiday, formatted_date, ""])
+            else:
+                room_number = room_label(corpus, floor, duty.room, number_after_corpus)
+                table.add_row([room_number, formatted_date, ""])
             table.add_hline()
-            
-            # increment room number index
-            room_number_index = (room_number_index % num_rooms) + 1
 
     doc.append(NoEscape(r'\end{center}'))
 
@@ -87,13 +70,15 @@ def generate_pdf_table(corpus, floor, number_after_corpus, num_rooms, your_room_
             print(e.output.decode("utf-8"))  # display the LaTeX error output
 
 # testing the method with inputs
-generate_pdf_table(
-    corpus="3D", 
-    floor="1", 
-    number_after_corpus="0", 
-    num_rooms=13, 
-    your_room_number=999, 
-    username="rifo", 
-    start_date='06.12.2024', 
-    num_days=365
-)
+if __name__ == "__main__":
+    generate_pdf_table(
+        corpus="3D",
+        floor="1",
+        number_after_corpus="0",
+        num_rooms=13,
+        your_room_number=999,
+        username="rifo",
+        start_date='06.12.2024',
+        num_days=365,
+        language="en",  # or "uk"
+    )
@@ -0,0 +1,119 @@
+"""
+In-process metrics: per-stage timing histograms and counters.
+
+Stages are timed with `with metrics.timer("latex_compile"): ...` and read back as
+a text summary (/stats) or in the Prometheus text format. Timings recorded in
+another process (process-pool or shared render workers) stay in that process.
+"""
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# histogram bucket upper bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram plus a window of recent samples for percentiles.
+    """
+
+    def __init__(self, buckets=BUCKETS, window=1000):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+
+    def percentile(self, fraction):
+        """
+        Percentile over the recent window, or None without samples.
+        """
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Metrics:
+    """
+    Thread-safe registry of named histograms (durations) and counters.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Time the block and record it under stage, whether it succeeds or not.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        """
+        Human-readable table of every stage and counter.
+        """
+        with self._lock:
+            lines = [f"Uptime: {(time.time() - self.started) / 3600:.1f} h"]
+            for stage, histogram in sorted(self.histograms.items()):
+                p50, p95 = histogram.percentile(0.5), histogram.percentile(0.95)
+                lines.append(
+                    f"{stage}: n={histogram.count} mean={histogram.total / histogram.count * 1000:.0f}ms "
+                    f"p50={p50 * 1000:.0f}ms p95={p95 * 1000:.0f}ms"
+                )
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+    def prometheus(self, prefix="dorm_bot"):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = [
+                f"# HELP {prefix}_stage_seconds Time spent in each stage of a schedule request.",
+                f"# TYPE {prefix}_stage_seconds histogram",
+            ]
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.total}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+# process-wide registry
+metrics = Metrics()
@@ -0,0 +1,215 @@
+"""
+Minimal pure-Python PDF writer for the schedule table.
+
+Only what the schedule needs: A4 pages, the built-in Helvetica font (WinAnsi
+encoding, so Latin-1 text only), text and straight lines. Pages are written to
+the output file as soon as they are complete, so memory does not grow with
+the number of pages.
+"""
+
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+CM = 28.3465
+# left, right, top, bottom
+DEFAULT_MARGINS = (1 * CM, 2.2 * CM, 1 * CM, 1 * CM)
+
+# Helvetica advance widths (1/1000 em) for ASCII 32..126, from the standard AFM metrics
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+
+def text_width(text, size):
+    """
+    Width of text in points when set in Helvetica at the given size.
+    """
+    total = 0
+    for char in text:
+        code = ord(char)
+        total += _HELVETICA_WIDTHS[code - 32] if 32 <= code <= 126 else 556
+    return total * size / 1000
+
+
+def fit_text(text, size, width):
+    """
+    Shorten text with an ellipsis until it fits in width.
+    """
+    if text_width(text, size) <= width:
+        return text
+    while text and text_width(text + "...", size) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+def _pdf_string(text):
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class PdfWriter:
+    """
+    Streams pages into a binary file object; call close() to write the trailer.
+    """
+
+    # fixed object numbers; everything else is allocated as pages are added
+    PAGES, CATALOG, FONT = 1, 2, 3
+
+    def __init__(self, file):
+        self.file = file
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 4
+        self.position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.file.write(data)
+        self.position += len(data)
+
+    def _object(self, object_id, body):
+        self.offsets[object_id] = self.position
+        self._write(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+
+    def add_page(self, content):
+        """
+        Write one page whose content stream is the given bytes.
+        """
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._object(content_id, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        self._object(
+            page_id,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (self.PAGES, PAGE_WIDTH, PAGE_HEIGHT, self.FONT, content_id),
+        )
+        self.page_ids.append(page_id)
+
+    def close(self):
+        self._object(self.FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self._object(self.PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids)))
+        self._object(self.CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % self.PAGES)
+
+        xref_offset = self.position
+        count = self.next_id
+        lines = [b"xref\n0 %d\n" % count, b"0000000000 65535 f \n"]
+        for object_id in range(1, count):
+            lines.append(b"%010d 00000 n \n" % self.offsets[object_id])
+        self._write(b"".join(lines))
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, self.CATALOG, xref_offset))
+
+
+class TablePage:
+    """
+    Builds the content stream of one page of a three-column grid table.
+    """
+
+    def __init__(self, left, top, column_widths, font_size, row_height):
+        self.left = left
+        self.y = top
+        self.column_widths = column_widths
+        self.font_size = font_size
+        self.row_height = row_height
+        self.parts = [b"0.5 w\n"]
+
+    def text(self, x, y, text, size=None):
+        size = size or self.font_size
+        self.parts.append(b"BT /F1 %.1f Tf %.2f %.2f Td %s Tj ET\n" % (size, x, y, _pdf_string(text)))
+
+    def centered(self, text, size):
+        width = sum(self.column_widths)
+        x = self.left + (width - text_width(text, size)) / 2
+        self.y -= size * 1.6
+        self.text(x, self.y + size * 0.4, text, size)
+
+    def row(self, cells):
+        """
+        Draw one bordered row. A cell may be a (left, right) pair, which is set
+        flush left and flush right like LaTeX's \\hfill.
+        """
+        padding = 4
+        top, bottom = self.y, self.y - self.row_height
+        baseline = bottom + (self.row_height - self.font_size * 0.7) / 2
+        x = self.left
+        width_total = sum(self.column_widths)
+        self.parts.append(b"%.2f %.2f m %.2f %.2f l S\n" % (x, top, x + width_total, top))
+        self.parts.append(b"%.2f %.2f m %.2f %.2f l S\n" % (x, bottom, x + width_total, bottom))
+        for cell, width in zip(cells, self.column_widths):
+            self.parts.append(b"%.2f %.2f m %.2f %.2f l S\n" % (x, top, x, bottom))
+            inner = width - 2 * padding
+            if isinstance(cell, tuple):
+                left_text, right_text = cell
+                right_width = text_width(right_text, self.font_size)
+                self.text(x + padding, baseline, fit_text(left_text, self.font_size, inner - right_width - padding))
+                self.text(x + width - padding - right_width, baseline, right_text)
+            elif cell:
+                self.text(x + padding, baseline, fit_text(cell, self.font_size, inner))
+            x += width
+        self.parts.append(b"%.2f %.2f m %.2f %.2f l S\n" % (x, top, x, bottom))
+        self.y = bottom
+
+    def content(self):
+        return b"".join(self.parts)
+
+
+def page_count(row_count, font_size=14, margins=None):
+    """
+    Number of pages write_table needs for row_count rows, without rendering them.
+    """
+    _, _, top, bottom = margins or DEFAULT_MARGINS
+    row_height = font_size * 1.6
+    # same arithmetic as write_tables: title and header on the first page, header on the others
+    y = PAGE_HEIGHT - top - font_size * 1.6 - row_height
+    pages = 1
+    for _ in range(row_count):
+        if y - row_height < bottom:
+            pages += 1
+            y = PAGE_HEIGHT - top - row_height
+        y -= row_height
+    return pages
+
+
+def write_table(file, title, header, rows, column_fractions=(0.3, 0.55, 0.15), font_size=14, margins=None, on_page=None):
+    """
+    Stream a titled table with a repeated header row into file, one page at a time.
+
+    rows is any iterable of cell lists (see TablePage.row); it is consumed lazily.
+    on_page, if given, is called with the number of pages written so far after each
+    page. Returns the number of pages written.
+    """
+    return write_tables(file, [(title, header, rows)], column_fractions, font_size, margins, on_page)
+
+
+def write_tables(file, tables, column_fractions=(0.3, 0.55, 0.15), font_size=14, margins=None, on_page=None):
+    """
+    Like write_table for several (title, header, rows) tables, each starting on a new page.
+    """
+    left, right, top, bottom = margins or DEFAULT_MARGINS
+    text_width_total = PAGE_WIDTH - left - right
+    column_widths = [text_width_total * fraction for fraction in column_fractions]
+    row_height = font_size * 1.6
+
+    writer = PdfWriter(file)
+    for title, header, rows in tables:
+        page = TablePage(left, PAGE_HEIGHT - top, column_widths, font_size, row_height)
+        page.centered(title, font_size)
+        page.row(header)
+        for cells in rows:
+            if page.y - row_height < bottom:
+                writer.add_page(page.content())
+                if on_page:
+                    on_page(len(writer.page_ids))
+                page = TablePage(left, PAGE_HEIGHT - top, column_widths, font_size, row_height)
+                page.row(header)
+            page.row(cells)
+        writer.add_page(page.content())
+        if on_page:
+            on_page(len(writer.page_ids))
+    writer.close()
+    return len(writer.page_ids)
@@ -0,0 +1,70 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to capacity tokens, refilled at rate tokens per second.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens if available and return True, otherwise return False.
+        """
+        self._refill(time.monotonic())
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def retry_after(self, tokens=1):
+        """
+        Seconds until tokens will be available.
+        """
+        self._refill(time.monotonic())
+        return max(0.0, (tokens - self.tokens) / self.rate) if self.rate else float("inf")
+
+
+class RateLimiter:
+    """
+    One token bucket per key (e.g. Telegram user id), created on first use. Buckets
+    that have refilled completely are dropped, so memory follows active users only.
+    """
+
+    def __init__(self, rate, capacity, max_idle_keys=10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_idle_keys = max_idle_keys
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key, tokens=1):
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= self.max_idle_keys:
+                    self._prune()
+                bucket = self.buckets[key] = TokenBucket(self.rate, self.capacity)
+            return bucket.try_acquire(tokens)
+
+    def retry_after(self, key, tokens=1):
+        with self._lock:
+            bucket = self.buckets.get(key)
+            return bucket.retry_after(tokens) if bucket is not None else 0.0
+
+    def _prune(self):
+        now = time.monotonic()
+        for key, bucket in list(self.buckets.items()):
+            bucket._refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self.buckets[key]
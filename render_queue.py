@@ -0,0 +1,209 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from metrics import metrics
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the render queue already holds the maximum number of waiting jobs.
+    """
+
+
+class RenderJob:
+    """
+    A single blocking render call waiting for (or running on) a worker.
+    """
+
+    def __init__(self, func, args, user_id=None):
+        self.func = func
+        self.args = args
+        self.user_id = user_id
+        self.submitted = time.perf_counter()
+        self.future = asyncio.get_running_loop().create_future()
+
+    def __await__(self):
+        return self.future.__await__()
+
+
+class RenderQueue:
+    """
+    Bounded queue that runs blocking render functions on a thread or process pool,
+    so pdflatex never blocks the bot's event loop.
+    """
+
+    def __init__(self, workers=2, max_size=20, executor="thread"):
+        self.workers = workers
+        self.max_size = max_size
+        self.executor_kind = executor
+        self.waiting = deque()
+        self.queue = None
+        self.executor = None
+        self.tasks = []
+
+    async def start(self):
+        if self.executor_kind == "process":
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logging.info(f"Render queue started: {self.workers} {self.executor_kind} worker(s), max {self.max_size} waiting")
+
+    def submit(self, func, *args, user_id=None):
+        """
+        Queue a render and return the job; raises QueueFullError when the queue is full.
+        """
+        if len(self.waiting) >= self.max_size:
+            raise QueueFullError(f"{len(self.waiting)} jobs already waiting")
+        job = RenderJob(func, args, user_id)
+        self.waiting.append(job)
+        self.queue.put_nowait(job)
+        return job
+
+    def queued(self):
+        """
+        Number of jobs waiting for a worker.
+        """
+        return len(self.waiting)
+
+    def position(self, job):
+        """
+        1-based position of the job among waiting jobs, or 0 once a worker has picked it up.
+        """
+        try:
+            return self.waiting.index(job) + 1
+        except ValueError:
+            return 0
+
+    def cancel(self, job):
+        """
+        Cancel a job that is still waiting; the worker skips it. Returns whether it was cancelled.
+        """
+        if self.position(job) == 0:
+            return False
+        return job.future.cancel()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            self.waiting.remove(job)
+            metrics.observe("queue_wait", time.perf_counter() - job.submitted)
+            try:
+                if not job.future.cancelled():
+                    result = await loop.run_in_executor(self.executor, job.func, *job.args)
+                    if not job.future.done():
+                        job.future.set_result(result)
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    async def shutdown(self, drain_timeout=None):
+        """
+        Stop the workers. With drain_timeout, first give queued and running jobs up to
+        that many seconds to finish.
+        """
+        if drain_timeout and self.queue is not None and self.tasks:
+            try:
+                await asyncio.wait_for(self.queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"Render queue not drained after {drain_timeout}s, {len(self.waiting)} job(s) dropped")
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        logging.info("Render queue stopped")
+
+
+class SharedRenderQueue:
+    """
+    RenderQueue stand-in for multi-process deployments: jobs are written to the
+    shared store's job table and rendered by separate render_worker.py processes.
+
+    Only functions registered in render_worker.TASKS can be submitted; they are sent
+    by name with JSON-serializable arguments.
+    """
+
+    def __init__(self, store, max_size=20, poll_interval=0.2):
+        self.store = store
+        self.max_size = max_size
+        self.poll_interval = poll_interval
+        self.pending = {}
+        self.poller = None
+
+    async def start(self):
+        self.poller = asyncio.create_task(self._poll())
+        logging.info(f"Shared render queue started, max {self.max_size} waiting")
+
+    def submit(self, func, *args, user_id=None):
+        if self.store.queued_jobs() >= self.max_size:
+            raise QueueFullError("shared render queue is full")
+        job_id = self.store.enqueue_job({"task": func.__name__, "args": list(args), "user_id": user_id})
+        job = SharedRenderJob(job_id)
+        self.pending[job_id] = job
+        return job
+
+    def queued(self):
+        return self.store.queued_jobs()
+
+    def position(self, job):
+        return self.store.job_position(job.job_id)
+
+    def cancel(self, job):
+        # marked in the job table, so no worker process picks it up any more
+        if not self.store.cancel_job(job.job_id):
+            return False
+        self.pending.pop(job.job_id, None)
+        return job.future.cancel()
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for job_id, job in list(self.pending.items()):
+                status, result, error = self.store.job_status(job_id)
+                if status not in ("done", "failed", "cancelled"):
+                    continue
+                del self.pending[job_id]
+                if job.future.done():
+                    continue
+                if status == "cancelled":
+                    job.future.cancel()
+                elif status == "done":
+                    job.future.set_result(result)
+                else:
+                    job.future.set_exception(RuntimeError(error))
+
+    async def shutdown(self, drain_timeout=None):
+        """
+        Stop polling. With drain_timeout, first wait that long for submitted jobs.
+        """
+        if drain_timeout and self.pending:
+            futures = [job.future for job in self.pending.values()]
+            await asyncio.wait(futures, timeout=drain_timeout)
+        if self.poller is not None:
+            self.poller.cancel()
+            await asyncio.gather(self.poller, return_exceptions=True)
+            self.poller = None
+        logging.info("Shared render queue stopped")
+
+
+class SharedRenderJob:
+    """
+    Handle of a job in the shared queue; await it for the worker's result.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.future = asyncio.get_running_loop().create_future()
+
+    def __await__(self):
+        return self.future.__await__()
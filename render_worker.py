@@ -0,0 +1,90 @@
+"""
+Render worker for the shared job queue.
+
+Run any number of these next to one or more bots started with RENDER_BACKEND=shared.
+All of them must use the same .env (STORAGE_PATH, SCHEDULE_DIR, RENDERER,
+HOLIDAY_COUNTRY) and see the same files:
+
+    python render_worker.py
+"""
+import os
+import time
+import signal
+import socket
+import logging
+from dotenv import load_dotenv
+
+from languages import LANGUAGES, DEFAULT_LANGUAGE
+from renderers import get_renderer
+from storage import open_store
+
+load_dotenv()
+STORAGE = os.getenv("STORAGE", "sqlite")
+STORAGE_PATH = os.getenv("STORAGE_PATH")
+RENDERER = os.getenv("RENDERER", "latex")
+HOLIDAY_COUNTRY = os.getenv("HOLIDAY_COUNTRY")
+POLL_INTERVAL = float(os.getenv("RENDER_WORKER_POLL_SECONDS", "0.5"))
+JOB_TIMEOUT = int(os.getenv("RENDER_JOB_TIMEOUT", "600"))
+
+renderers = {code: get_renderer(RENDERER, language=code, holiday_country=HOLIDAY_COUNTRY) for code in LANGUAGES}
+
+
+def generate_pdf(corpus, floor, num_rooms, your_room_number, username, start_date, num_days, output_filename, progress=None, language=DEFAULT_LANGUAGE, first_room=1):
+    # progress callbacks cannot cross processes; the argument keeps the bot's task signature
+    logging.info(f"Generating PDF file: {output_filename}")
+    return renderers[language].render(
+        corpus, floor, num_rooms, your_room_number, username, start_date, num_days, output_filename,
+        language=language, first_room=first_room,
+    )
+
+
+# functions the bot may submit, by name
+TASKS = {
+    "generate_pdf": generate_pdf,
+}
+
+
+def run(store, worker_id, should_stop):
+    """
+    Claim and run jobs until should_stop() returns True.
+    """
+    logging.info(f"Render worker {worker_id} started")
+    cleanup_at = 0
+    while not should_stop():
+        claimed = store.claim_job(worker_id, stale_after=JOB_TIMEOUT)
+        if claimed is None:
+            if time.time() > cleanup_at:
+                store.delete_finished_jobs()
+                cleanup_at = time.time() + 600
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        job_id, payload = claimed
+        started = time.perf_counter()
+        try:
+            result = TASKS[payload["task"]](*payload["args"])
+            store.finish_job(job_id, result=result)
+            logging.info(f"Job {job_id} done in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {str(e)}")
+            store.finish_job(job_id, error=str(e) or type(e).__name__)
+    logging.info(f"Render worker {worker_id} stopped")
+
+
+def main():
+    if STORAGE == "json":
+        # the jobs come from the store, and a JSON file cannot be shared between processes
+        raise SystemExit("render_worker.py needs STORAGE=sqlite; a JSON store cannot hold the shared job queue")
+    logging.basicConfig(level=logging.INFO)
+    store = open_store(STORAGE, STORAGE_PATH)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    # finish the current job on SIGTERM/SIGINT, then exit
+    stopping = []
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopping.append(True))
+    run(store, worker_id, lambda: bool(stopping))
+
+
+if __name__ == "__main__":
+    main()
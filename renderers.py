@@ -0,0 +1,321 @@
+import io
+import os
+import shutil
+import logging
+import tempfile
+from datetime import timedelta
+from contextlib import contextmanager
+
+from pylatex import Document, NoEscape
+from pylatex.utils import escape_latex
+
+import latex_format
+import pdf_writer
+from duty_optimizer import balanced_duties
+from holiday_index import holiday_index
+from languages import DEFAULT_LANGUAGE, get_language
+from metrics import metrics
+from schedule_engine import iter_duties, parse_start_date, room_label
+
+# how duties are handed out to the rooms, see Renderer
+ASSIGNMENTS = ("rotation", "balanced")
+
+
+class Renderer:
+    """
+    Turns schedule parameters into a PDF file.
+
+    render() writes f"{output_filename}.pdf" and returns output_filename, matching
+    the pylatex convention of paths without extension. Renderers that can tell how
+    far they are call progress(page, pages) as pages are finished; others ignore it.
+
+    language is a code from languages.LANGUAGES; it picks the title, header, weekday
+    names and, unless the renderer was given a holiday_country, the holiday calendar.
+    first_room is the room due on the first working day, so that a schedule can
+    continue the rotation of the one before it.
+
+    assignment "rotation" cycles through the rooms in order; "balanced" evens out
+    weekend and weekday duties per room (see duty_optimizer) and honours exclusions,
+    {room: dates the residents are away}, which the plain rotation ignores.
+    """
+
+    name = None
+    # whether render_bytes works without touching the filesystem
+    in_memory = False
+
+    def __init__(self, holiday_country=None, assignment="rotation"):
+        if assignment not in ASSIGNMENTS:
+            raise ValueError(f"Unknown assignment {assignment!r}, expected one of: {', '.join(ASSIGNMENTS)}")
+        self.holiday_country = holiday_country
+        self.assignment = assignment
+
+    def supports(self, language):
+        """
+        Whether this renderer can typeset the given language.
+        """
+        return True
+
+    def holiday_country_for(self, language):
+        return self.holiday_country if self.holiday_country is not None else get_language(language).holiday_country
+
+    def duties(self, num_rooms, your_room_number, username, start_date, num_days, language=DEFAULT_LANGUAGE, first_room=1, exclusions=None):
+        # shared holiday calendar, extended to whatever years the schedule spans
+        with metrics.timer("holiday_lookup"):
+            holidays = holiday_index(self.holiday_country_for(language))
+            first_day = parse_start_date(start_date)
+            holidays.ensure_range(first_day, first_day + timedelta(days=num_days))
+        if self.assignment == "balanced":
+            return balanced_duties(start_date, num_days, num_rooms, holidays, your_room_number, username, first_room, exclusions)
+        return iter_duties(start_date, num_days, num_rooms, holidays, your_room_number, username, first_room)
+
+    def render(self, corpus, floor, num_rooms, your_room_number, username, start_date, num_days, output_filename, progress=None, language=DEFAULT_LANGUAGE, first_room=1, exclusions=None):
+        raise NotImplementedError
+
+    def render_bytes(self, corpus, floor, num_rooms, your_room_number, username, start_date, num_days, progress=None, language=DEFAULT_LANGUAGE, first_room=1, exclusions=None):
+        """
+        Render the schedule and return the PDF as bytes. This default renders into a
+        temporary directory and reads the file back.
+        """
+        with tempfile.TemporaryDirectory(prefix=SCRATCH_PREFIX) as directory:
+            output_filename = os.path.join(directory, "schedule")
+            self.render(
+                corpus, floor, num_rooms, your_room_number, username, start_date, num_days, output_filename, progress, language, first_room,
+                exclusions,
+            )
+            with open(f"{output_filename}.pdf", "rb") as file:
+                return file.read()
+
+    def render_many(self, schedules, output_filename, language=DEFAULT_LANGUAGE):
+        """
+        Render several (corpus, floor, num_rooms, start_date, num_days[, exclusions[, first_room]])
+        schedules into one PDF, each starting on a new page.
+        """
+        raise NotImplementedError
+
+
+# optional trailing items of a render_many tuple, in order
+SCHEDULE_OPTIONS = ("exclusions", "first_room")
+
+
+def schedule_title(corpus, floor, language=DEFAULT_LANGUAGE):
+    return get_language(language).text("building_title", corpus=corpus, floor=floor)
+
+
+def duty_cell(corpus, floor, duty, language=DEFAULT_LANGUAGE):
+    """
+    First column of a row: the room on duty, the holiday's name, or a note that
+    every resident is away.
+    """
+    if duty.room is not None:
+        return room_label(corpus, floor, duty.room)
+    if duty.holiday is not None:
+        return duty.holiday
+    return get_language(language).text("everyone_away")
+
+
+SCRATCH_PREFIX = ".render-"
+
+
+@contextmanager
+def scratch_output(output_filename):
+    """
+    Yield a path (without extension) inside a private scratch directory next to
+    output_filename. If the block succeeds, the PDF written there is moved to
+    f"{output_filename}.pdf" in one os.replace, so readers never see a partial file
+    and concurrent renders of the same output cannot mix. The scratch directory,
+    with the .tex/.aux/.log files, is removed either way.
+    """
+    directory = os.path.dirname(output_filename) or "."
+    os.makedirs(directory, exist_ok=True)
+    scratch = tempfile.mkdtemp(prefix=SCRATCH_PREFIX, dir=directory)
+    try:
+        scratch_name = os.path.join(scratch, os.path.basename(output_filename))
+        yield scratch_name
+        os.replace(f"{scratch_name}.pdf", f"{output_filename}.pdf")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+class LatexRenderer(Renderer):
+    """
+    The original pylatex + pdflatex backend.
+
+    Rows are written to the .tex file as the schedule engine yields them instead of
+    being collected in a pylatex Document first, so memory does not grow with num_days.
+    """
+
+    name = "latex"
+
+    def preamble(self, language=DEFAULT_LANGUAGE):
+        """
+        LaTeX source of the fixed preamble, shared by every schedule in the language.
+        """
+        # preparing the document with uniform margins and updated font size
+        doc = Document()
+        doc.preamble.append(NoEscape(r'\usepackage[table,xcdraw]{xcolor}'))
+        doc.preamble.append(NoEscape(r'\usepackage{longtable}'))
+        doc.preamble.append(NoEscape(r'\usepackage[left=1cm,right=2.2cm,top=1cm,bottom=1cm]{geometry}'))
+        doc.preamble.append(NoEscape(r'\usepackage{setspace}'))
+        doc.preamble.append(NoEscape(r'\setlength{\parindent}{0pt}'))
+        doc.preamble.append(NoEscape(r'\renewcommand{\familydefault}{\sfdefault}'))
+        doc.preamble.append(NoEscape(r'\pagenumbering{gobble}'))  # remove page numbering
+        for line in get_language(language).latex_preamble:
+            doc.preamble.append(NoEscape(line))
+        return latex_format.preamble_of(doc)
+
+    def write_tex(self, file, corpus, floor, num_rooms, your_room_number, username, start_date, num_days, preamble=None, language=DEFAULT_LANGUAGE, first_room=1, exclusions=None):
+        """
+        Stream the complete LaTeX source of the schedule into a text file object.
+        """
+        file.write(preamble or self.preamble(language))
+        file.write("\\begin{document}%\n")
+        self.write_table_tex(
+            file, corpus, floor, num_rooms, your_room_number, username, start_date, num_days,
+            language=language, first_room=first_room, exclusions=exclusions,
+        )
+        file.write("\\end{document}\n")
+
+    def write_table_tex(self, file, corpus, floor, num_rooms, your_room_number, username, start_date, num_days, title=None, language=DEFAULT_LANGUAGE, first_room=1, exclusions=None):
+        """
+        Stream the body of one schedule (title and longtable) into a text file object.
+        """
+        strings = get_language(language)
+        title = title or strings.text("title")
+        # setting font size for the entire document
+        file.write("\\fontsize{14pt}{16pt}\\selectfont%\n")
+
+        # centering the table itself
+        file.write(f"\\begin{{center}}%\n{escape_latex(title)}%\n")
+
+        # creating a longtable for multi-page support
+        file.write("\\begin{longtable}{|p{0.3\\textwidth}|p{0.55\\textwidth}|p{0.15\\textwidth}|}%\n")
+        header = "&".join(escape_latex(cell) for cell in strings.text("header"))
+        file.write(f"\\hline%\n{header}\\\\%\n\\hline%\n\\endhead%\n\\hline%\n")
+
+        # adding table rows
+        for duty in self.duties(num_rooms, your_room_number, username, start_date, num_days, language, first_room, exclusions):
+            # formatting the date with \hfill
+            formatted_date = f"{escape_latex(strings.weekday(duty.date))}\\hfill {duty.date.strftime('%d.%m.%Y')}"
+            # holidays get a row with the holiday name instead of a room
+            file.write(f"{escape_latex(duty_cell(corpus, floor, duty, language))}&{formatted_date}&\\\\%\n\\hline%\n")
+
+        file.write("\\end{longtable}%\n\\end{center}%\n")
+
+    def render(self, corpus, floor, num_rooms, your_room_number, username, start_date, num_days, output_filename, progress=None, language=DEFAULT_LANGUAGE, first_room=1, exclusions=None):
+        # a single pdflatex run gives no page-by-page progress
+        preamble = self.preamble(language)
+        with scratch_output(output_filename) as scratch_name:
+            with metrics.timer("document_build"), open(f"{scratch_name}.tex", "w", encoding="utf-8") as file:
+                self.write_tex(
+                    file, corpus, floor, num_rooms, your_room_number, username, start_date, num_days, preamble, language,
+                    first_room, exclusions,
+                )
+            with metrics.timer("latex_compile"):
+                latex_format.compile_tex(scratch_name, preamble)
+        return output_filename
+
+    def render_many(self, schedules, output_filename, language=DEFAULT_LANGUAGE):
+        preamble = self.preamble(language)
+        with scratch_output(output_filename) as scratch_name:
+            with metrics.timer("document_build"), open(f"{scratch_name}.tex", "w", encoding="utf-8") as file:
+                file.write(preamble)
+                file.write("\\begin{document}%\n")
+                for i, (corpus, floor, num_rooms, start_date, num_days, *options) in enumerate(schedules):
+                    if i:
+                        file.write("\\newpage%\n")
+                    self.write_table_tex(
+                        file, corpus, floor, num_rooms, None, "", start_date, num_days,
+                        schedule_title(corpus, floor, language), language, **dict(zip(SCHEDULE_OPTIONS, options)),
+                    )
+                file.write("\\end{document}\n")
+            with metrics.timer("latex_compile"):
+                latex_format.compile_tex(scratch_name, preamble)
+        return output_filename
+
+
+class NativeRenderer(Renderer):
+    """
+    In-process PDF writer: no TeX installation, no subprocess, pages streamed to disk.
+    Uses the built-in Helvetica font, so it only covers Latin-1 text.
+    """
+
+    name = "native"
+    in_memory = True
+
+    def supports(self, language):
+        return get_language(language).latin1
+
+    def rows(self, corpus, floor, num_rooms, your_room_number, username, start_date, num_days, language=DEFAULT_LANGUAGE, first_room=1, exclusions=None):
+        strings = get_language(language)
+        for duty in self.duties(num_rooms, your_room_number, username, start_date, num_days, language, first_room, exclusions):
+            formatted_date = (strings.weekday(duty.date), duty.date.strftime('%d.%m.%Y'))
+            yield [duty_cell(corpus, floor, duty, language), formatted_date, ""]
+
+    def _on_page(self, num_days, progress):
+        if progress is None:
+            return None
+        # one row per day, so the page count is known before rendering
+        pages = pdf_writer.page_count(num_days)
+        return lambda page: progress(page, pages)
+
+    def render(self, corpus, floor, num_rooms, your_room_number, username, start_date, num_days, output_filename, progress=None, language=DEFAULT_LANGUAGE, first_room=1, exclusions=None):
+        strings = get_language(language)
+        rows = self.rows(
+            corpus, floor, num_rooms, your_room_number, username, start_date, num_days, language, first_room, exclusions,
+        )
+        with metrics.timer("document_build"), scratch_output(output_filename) as scratch_name, open(f"{scratch_name}.pdf", "wb") as file:
+            pages = pdf_writer.write_table(
+                file, strings.text("title"), strings.text("header"), rows, on_page=self._on_page(num_days, progress),
+            )
+        logging.info(f"Rendered {pages} page(s) natively: {output_filename}.pdf")
+        return output_filename
+
+    def render_bytes(self, corpus, floor, num_rooms, your_room_number, username, start_date, num_days, progress=None, language=DEFAULT_LANGUAGE, first_room=1, exclusions=None):
+        strings = get_language(language)
+        rows = self.rows(
+            corpus, floor, num_rooms, your_room_number, username, start_date, num_days, language, first_room, exclusions,
+        )
+        buffer = io.BytesIO()
+        with metrics.timer("document_build"):
+            pages = pdf_writer.write_table(
+                buffer, strings.text("title"), strings.text("header"), rows, on_page=self._on_page(num_days, progress),
+            )
+        logging.info(f"Rendered {pages} page(s) natively in memory")
+        return buffer.getvalue()
+
+    def render_many(self, schedules, output_filename, language=DEFAULT_LANGUAGE):
+        header = get_language(language).text("header")
+        tables = (
+            (
+                schedule_title(corpus, floor, language), header,
+                self.rows(
+                    corpus, floor, num_rooms, None, "", start_date, num_days, language, **dict(zip(SCHEDULE_OPTIONS, options)),
+                ),
+            )
+            for corpus, floor, num_rooms, start_date, num_days, *options in schedules
+        )
+        with metrics.timer("document_build"), scratch_output(output_filename) as scratch_name, open(f"{scratch_name}.pdf", "wb") as file:
+            pages = pdf_writer.write_tables(file, tables)
+        logging.info(f"Rendered {pages} page(s) natively: {output_filename}.pdf")
+        return output_filename
+
+
+RENDERERS = {
+    LatexRenderer.name: LatexRenderer,
+    NativeRenderer.name: NativeRenderer,
+}
+
+
+def get_renderer(name, language=None, **kwargs):
+    """
+    Instantiate the renderer registered under name ("latex" or "native"). Given a
+    language, fall back to LaTeX when the named renderer cannot typeset it.
+    """
+    try:
+        renderer = RENDERERS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown renderer {name!r}, expected one of: {', '.join(RENDERERS)}")
+    if language is not None and not renderer.supports(language):
+        logging.info(f"Renderer {name!r} cannot typeset {language!r}, using LaTeX")
+        renderer = LatexRenderer(**kwargs)
+    return renderer
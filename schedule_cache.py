@@ -0,0 +1,152 @@
+import os
+import time
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+
+class ScheduleCache:
+    """
+    Content-addressed store of rendered schedules.
+
+    Every schedule is saved as <directory>/<key>.pdf where the key is a hash of all
+    inputs that affect the output, so identical requests share one file.
+
+    PDFs rendered in memory are kept in a small LRU of bytes instead (up to
+    max_memory_bytes) and never written to disk; once sent, Telegram's file_id
+    takes over.
+    """
+
+    def __init__(self, directory="Schedule", max_bytes=200 * 1024 * 1024, max_age=7 * 24 * 3600, max_memory_bytes=32 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_memory_bytes = max_memory_bytes
+        self.memory = OrderedDict()
+        self.memory_size = 0
+        self._memory_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(**params):
+        """
+        Stable hash of the schedule parameters.
+        """
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def path(self, key):
+        """
+        Output path without extension, as pylatex expects it.
+        """
+        return os.path.join(self.directory, key)
+
+    def contains(self, key):
+        """
+        Whether the schedule is cached, without counting a hit or miss.
+        """
+        return key in self.memory or os.path.exists(f"{self.path(key)}.pdf")
+
+    def get(self, key):
+        """
+        Return the output path of a cached schedule, or None on a miss. For schedules
+        held in memory the path is nominal; read them with get_bytes().
+        """
+        pdf_file = f"{self.path(key)}.pdf"
+        if self.get_bytes(key) is not None or os.path.exists(pdf_file):
+            self.hits += 1
+            if os.path.exists(pdf_file):
+                os.utime(pdf_file)  # keep recently used files from being evicted first
+            logging.info(f"Schedule cache hit: {key} (hits={self.hits}, misses={self.misses})")
+            return self.path(key)
+        self.misses += 1
+        logging.info(f"Schedule cache miss: {key} (hits={self.hits}, misses={self.misses})")
+        return None
+
+    def get_bytes(self, key):
+        """
+        The PDF bytes of a schedule rendered in memory, or None.
+        """
+        with self._memory_lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+            return data
+
+    def put_bytes(self, key, data):
+        """
+        Keep an in-memory PDF, dropping the least recently used ones beyond max_memory_bytes.
+        """
+        with self._memory_lock:
+            if key in self.memory:
+                self.memory_size -= len(self.memory.pop(key))
+            self.memory[key] = data
+            self.memory_size += len(data)
+            while self.memory_size > self.max_memory_bytes and len(self.memory) > 1:
+                _, dropped = self.memory.popitem(last=False)
+                self.memory_size -= len(dropped)
+
+    def clear(self):
+        """
+        Drop every cached schedule, in memory and on disk.
+        """
+        with self._memory_lock:
+            self.memory.clear()
+            self.memory_size = 0
+        for name in os.listdir(self.directory):
+            full_path = os.path.join(self.directory, name)
+            if os.path.isfile(full_path):
+                os.remove(full_path)
+
+    def evict(self):
+        """
+        Delete schedules older than max_age, then the least recently used ones until
+        the directory fits in max_bytes. Scratch directories of killed renders are
+        swept as well.
+        """
+        self._remove_stale_scratch()
+        groups = {}
+        for name in os.listdir(self.directory):
+            full_path = os.path.join(self.directory, name)
+            if not os.path.isfile(full_path):
+                continue
+            stem = name.split(".", 1)[0]
+            stat = os.stat(full_path)
+            size, mtime = groups.get(stem, (0, 0))
+            groups[stem] = (size + stat.st_size, max(mtime, stat.st_mtime))
+
+        now = time.time()
+        total = sum(size for size, _ in groups.values())
+        removed = 0
+        for stem, (size, mtime) in sorted(groups.items(), key=lambda item: item[1][1]):
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            self._remove(stem)
+            total -= size
+            removed += 1
+
+        if removed:
+            logging.info(f"Evicted {removed} cached schedule(s), {total} bytes left")
+
+    def _remove_stale_scratch(self, older_than=3600):
+        # scratch directories are removed by the renderer; this only catches those
+        # left behind by a process that was killed mid-render
+        now = time.time()
+        for name in os.listdir(self.directory):
+            full_path = os.path.join(self.directory, name)
+            if name.startswith(".render-") and os.path.isdir(full_path) and now - os.stat(full_path).st_mtime > older_than:
+                shutil.rmtree(full_path, ignore_errors=True)
+
+    def _remove(self, stem):
+        for name in os.listdir(self.directory):
+            if name.split(".", 1)[0] == stem:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
@@ -0,0 +1,144 @@
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# One row of the schedule. room is the 1-based room index on the floor, or None
+# when the day is a holiday (holiday then holds its name) or when nobody can take
+# it because every resident is away (holiday is None as well).
+Duty = namedtuple("Duty", ["date", "room", "holiday", "resident"])
+
+
+def parse_start_date(start_date):
+    """
+    Accept either a 'dd.mm.yyyy' string or a datetime.
+    """
+    if isinstance(start_date, str):
+        return datetime.strptime(start_date, '%d.%m.%Y')
+    return start_date
+
+
+def iter_duties(start_date, num_days, num_rooms, holidays=None, your_room_number=None, username="", first_room=1):
+    """
+    Lazily yield one Duty per day, cycling through the rooms and skipping holidays.
+
+    holidays is anything supporting `date in holidays` and `holidays.get(date)`,
+    e.g. a holidays.CountryHoliday; pass None to ignore holidays.
+    """
+    start_date = parse_start_date(start_date)
+    room_number_index = first_room
+    for i in range(num_days):
+        # calculating the current date
+        current_date = start_date + timedelta(days=i)
+
+        # holidays do not consume a room's turn
+        if holidays is not None and current_date in holidays:
+            yield Duty(current_date, None, holidays.get(current_date), "")
+            continue
+
+        # checking if the current room is the user's room
+        resident = username if room_number_index == your_room_number else ""
+        yield Duty(current_date, room_number_index, None, resident)
+
+        # increment room number index
+        room_number_index = (room_number_index % num_rooms) + 1
+
+
+def room_label(corpus, floor, room, number_after_corpus=""):
+    """
+    Printed room number, e.g. 3D.1.7 (or 3D.1.07 with number_after_corpus="0").
+    """
+    if room < 10:
+        return f"{corpus}.{floor}.{number_after_corpus}{room}"
+    return f"{corpus}.{floor}.{room}"
+
+
+class RotationIndex:
+    """
+    Answers rotation queries without walking the schedule day by day.
+
+    Holidays are kept as sorted day offsets from start_date, so the k-th working day
+    and the duty index of any date follow from one bisect plus modular arithmetic,
+    i.e. O(log H) for H holidays in the horizon.
+    """
+
+    def __init__(self, start_date, num_rooms, holiday_dates=(), first_room=1):
+        self.start_date = parse_start_date(start_date)
+        if isinstance(self.start_date, datetime):
+            self.start_date = self.start_date.date()
+        self.num_rooms = num_rooms
+        self.first_room = first_room
+        offsets = sorted({
+            (day - self.start_date).days
+            for day in (d.date() if isinstance(d, datetime) else d for d in holiday_dates)
+            if day >= self.start_date
+        })
+        self.holiday_offsets = offsets
+        # offset minus position is non-decreasing, which lets us bisect working-day numbers
+        self.shifted_offsets = [offset - i for i, offset in enumerate(offsets)]
+
+    def _offset(self, day):
+        if isinstance(day, datetime):
+            day = day.date()
+        return (day - self.start_date).days
+
+    def is_holiday(self, day):
+        offset = self._offset(day)
+        i = bisect_left(self.holiday_offsets, offset)
+        return i < len(self.holiday_offsets) and self.holiday_offsets[i] == offset
+
+    def duty_number(self, day):
+        """
+        Number of working days between start_date and day (exclusive).
+        """
+        offset = self._offset(day)
+        return offset - bisect_left(self.holiday_offsets, offset)
+
+    def working_day(self, k):
+        """
+        Date of the k-th (0-based) non-holiday day from start_date.
+        """
+        return self.start_date + timedelta(days=k + bisect_right(self.shifted_offsets, k))
+
+    def room_due(self, day):
+        """
+        Room whose turn comes next on day: the one on duty, or after a holiday the one
+        on duty on the next working day. A schedule starting on day continues this
+        rotation with first_room=room_due(day).
+        """
+        return (self.first_room - 1 + self.duty_number(day)) % self.num_rooms + 1
+
+    def room_on(self, day):
+        """
+        Room on duty on the given day, or None for holidays and days before the start.
+        """
+        if self._offset(day) < 0 or self.is_holiday(day):
+            return None
+        return self.room_due(day)
+
+    def next_duties(self, room, count=5, after=None):
+        """
+        The next count duty dates of room, on or after the given day (default: start_date).
+        """
+        after = self.start_date if after is None else after
+        k = max(self.duty_number(after), 0)
+        # first working day number >= k that belongs to this room
+        k += (room - self.first_room - k) % self.num_rooms
+        return [self.working_day(k + i * self.num_rooms) for i in range(count)]
+
+
+def resume_rotation(cursor, num_rooms, holidays, day):
+    """
+    Room due on day when a floor's rotation continues from cursor, a saved
+    {"date": "dd.mm.yyyy", "room": ..., "num_rooms": ...} anchor. Falls back to room 1
+    without a cursor, for days before it, or if that room no longer exists.
+    holidays is a HolidayIndex of the floor's country.
+    """
+    if cursor is None:
+        return 1
+    anchor = datetime.strptime(cursor["date"], '%d.%m.%Y')
+    day = parse_start_date(day)
+    if day < anchor:
+        return 1
+    rotation = RotationIndex(anchor, cursor["num_rooms"], holidays.between(anchor, day), cursor["room"])
+    room = rotation.room_due(day)
+    return room if room <= num_rooms else 1
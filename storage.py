@@ -0,0 +1,436 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+from languages import DEFAULT_LANGUAGE
+
+
+class Store:
+    """
+    Persistent user profiles and floor configurations.
+
+    A profile holds everything the conversation collects (corpus, floor, num_rooms,
+    your_room_number, username, num_days), so returning users can skip the dialog.
+
+    Stores also keep generic JSON state in namespaces (bot persistence, Telegram
+    file ids) and, if they can be shared between processes, a render job queue.
+    """
+
+    def get_profile(self, user_id):
+        raise NotImplementedError
+
+    def save_profile(self, user_id, profile):
+        raise NotImplementedError
+
+    def get_floor(self, corpus, floor):
+        """
+        Number of rooms last reported for the floor, or None.
+        """
+        raise NotImplementedError
+
+    def save_floor(self, corpus, floor, num_rooms):
+        raise NotImplementedError
+
+    def schedule_configurations(self):
+        """
+        Distinct (corpus, floor, num_rooms, num_days, language) across all saved profiles.
+        """
+        configurations = set()
+        for profile in self.profiles():
+            configurations.add((
+                profile["corpus"], profile["floor"], profile["num_rooms"], profile["num_days"],
+                profile.get("language", DEFAULT_LANGUAGE),
+            ))
+        return configurations
+
+    def profiles(self):
+        raise NotImplementedError
+
+    def get_state(self, namespace, key):
+        raise NotImplementedError
+
+    def set_state(self, namespace, key, value):
+        raise NotImplementedError
+
+    def delete_state(self, namespace, key):
+        raise NotImplementedError
+
+    def delete_states(self, namespace, keys):
+        """
+        Delete several entries of the namespace at once.
+        """
+        for key in keys:
+            self.delete_state(namespace, key)
+
+    def all_state(self, namespace):
+        """
+        {key: value} of every entry in the namespace.
+        """
+        raise NotImplementedError
+
+    def enqueue_job(self, payload):
+        """
+        Add a render job for the worker processes and return its id.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be shared between processes")
+
+    def claim_job(self, worker_id, stale_after=600):
+        """
+        Take the oldest queued job (or one whose worker died stale_after seconds ago).
+        Returns (job_id, payload) or None.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be shared between processes")
+
+    def finish_job(self, job_id, result=None, error=None):
+        raise NotImplementedError(f"{type(self).__name__} cannot be shared between processes")
+
+    def job_status(self, job_id):
+        """
+        (status, result, error) where status is queued, running, done, failed or cancelled.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be shared between processes")
+
+    def job_position(self, job_id):
+        """
+        1-based position among queued jobs, or 0 once a worker has claimed it.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be shared between processes")
+
+    def queued_jobs(self):
+        raise NotImplementedError(f"{type(self).__name__} cannot be shared between processes")
+
+    def cancel_job(self, job_id):
+        """
+        Cancel the job if no worker has claimed it yet; returns whether it was cancelled.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be shared between processes")
+
+
+class SQLiteStore(Store):
+    """
+    Store backed by a SQLite database. Several bot and worker processes on the same
+    host (or sharing a volume) can use one database file.
+    """
+
+    def __init__(self, path="dorm_bot.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        # autocommit; the job queue opens its own write transactions
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        with self._lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS profiles (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS floors ("
+                "corpus TEXT NOT NULL, floor TEXT NOT NULL, num_rooms INTEGER NOT NULL, "
+                "PRIMARY KEY (corpus, floor))"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, payload TEXT NOT NULL, status TEXT NOT NULL, "
+                "result TEXT, error TEXT, created REAL NOT NULL, worker TEXT, claimed REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def get_profile(self, user_id):
+        rows = self._query("SELECT data FROM profiles WHERE user_id = ?", (user_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_profile(self, user_id, profile):
+        self._query("INSERT OR REPLACE INTO profiles (user_id, data) VALUES (?, ?)", (user_id, json.dumps(profile)))
+
+    def get_floor(self, corpus, floor):
+        rows = self._query("SELECT num_rooms FROM floors WHERE corpus = ? AND floor = ?", (corpus, floor))
+        return rows[0][0] if rows else None
+
+    def save_floor(self, corpus, floor, num_rooms):
+        self._query(
+            "INSERT OR REPLACE INTO floors (corpus, floor, num_rooms) VALUES (?, ?, ?)", (corpus, floor, num_rooms)
+        )
+
+    def profiles(self):
+        return [json.loads(row[0]) for row in self._query("SELECT data FROM profiles")]
+
+    def get_state(self, namespace, key):
+        rows = self._query("SELECT data FROM state WHERE namespace = ? AND key = ?", (namespace, str(key)))
+        return json.loads(rows[0][0]) if rows else None
+
+    def set_state(self, namespace, key, value):
+        self._query(
+            "INSERT OR REPLACE INTO state (namespace, key, data) VALUES (?, ?, ?)",
+            (namespace, str(key), json.dumps(value)),
+        )
+
+    def delete_state(self, namespace, key):
+        self._query("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, str(key)))
+
+    def delete_states(self, namespace, keys):
+        with self._lock:
+            self.connection.executemany(
+                "DELETE FROM state WHERE namespace = ? AND key = ?", [(namespace, str(key)) for key in keys]
+            )
+
+    def all_state(self, namespace):
+        rows = self._query("SELECT key, data FROM state WHERE namespace = ?", (namespace,))
+        return {key: json.loads(data) for key, data in rows}
+
+    def enqueue_job(self, payload):
+        job_id = uuid.uuid4().hex
+        self._query(
+            "INSERT INTO jobs (id, payload, status, created) VALUES (?, ?, 'queued', ?)",
+            (job_id, json.dumps(payload), time.time()),
+        )
+        return job_id
+
+    def claim_job(self, worker_id, stale_after=600):
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock, so two workers never claim the same job
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.connection.execute(
+                    "SELECT id, payload FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND claimed < ?) ORDER BY created LIMIT 1",
+                    (now - stale_after,),
+                ).fetchone()
+                if row:
+                    self.connection.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, claimed = ? WHERE id = ?",
+                        (worker_id, now, row[0]),
+                    )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def finish_job(self, job_id, result=None, error=None):
+        self._query(
+            "UPDATE jobs SET status = ?, result = ?, error = ? WHERE id = ?",
+            ("failed" if error else "done", json.dumps(result), error, job_id),
+        )
+
+    def job_status(self, job_id):
+        rows = self._query("SELECT status, result, error FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None, None, None
+        status, result, error = rows[0]
+        return status, json.loads(result) if result else None, error
+
+    def job_position(self, job_id):
+        rows = self._query(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' "
+            "AND created <= (SELECT created FROM jobs WHERE id = ? AND status = 'queued')",
+            (job_id,),
+        )
+        return rows[0][0]
+
+    def queued_jobs(self):
+        return self._query("SELECT COUNT(*) FROM jobs WHERE status = 'queued'")[0][0]
+
+    def cancel_job(self, job_id):
+        with self._lock:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = 'cancelled' WHERE id = ? AND status = 'queued'", (job_id,)
+            )
+            return cursor.rowcount > 0
+
+    def delete_finished_jobs(self, older_than=3600):
+        self._query(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND created < ?",
+            (time.time() - older_than,),
+        )
+
+
+class JsonStore(Store):
+    """
+    Store kept in a single JSON file, for single-process setups where SQLite is not wanted.
+    """
+
+    def __init__(self, path="dorm_bot.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {"profiles": {}, "floors": {}, "state": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    self.data.update(json.load(file))
+            except (OSError, ValueError) as e:
+                logging.error(f"Could not load {path}: {str(e)}")
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.data, file)
+        os.replace(tmp_path, self.path)
+
+    def get_profile(self, user_id):
+        return self.data["profiles"].get(str(user_id))
+
+    def save_profile(self, user_id, profile):
+        with self._lock:
+            self.data["profiles"][str(user_id)] = profile
+            self._save()
+
+    def get_floor(self, corpus, floor):
+        return self.data["floors"].get(f"{corpus}.{floor}")
+
+    def save_floor(self, corpus, floor, num_rooms):
+        with self._lock:
+            self.data["floors"][f"{corpus}.{floor}"] = num_rooms
+            self._save()
+
+    def profiles(self):
+        return list(self.data["profiles"].values())
+
+    def get_state(self, namespace, key):
+        return self.data["state"].get(namespace, {}).get(str(key))
+
+    def set_state(self, namespace, key, value):
+        with self._lock:
+            self.data["state"].setdefault(namespace, {})[str(key)] = value
+            self._save()
+
+    def delete_state(self, namespace, key):
+        with self._lock:
+            if self.data["state"].get(namespace, {}).pop(str(key), None) is not None:
+                self._save()
+
+    def delete_states(self, namespace, keys):
+        # one rewrite of the file instead of one per entry
+        with self._lock:
+            entries = self.data["state"].get(namespace, {})
+            removed = [entries.pop(str(key)) for key in keys if str(key) in entries]
+            if removed:
+                self._save()
+
+    def all_state(self, namespace):
+        return dict(self.data["state"].get(namespace, {}))
+
+
+def prune_state(store, namespace, max_age):
+    """
+    Delete the entries of namespace whose "saved" time is more than max_age seconds
+    ago (or missing), and return how many were deleted.
+    """
+    cutoff = time.time() - max_age
+    expired = [
+        key for key, value in store.all_state(namespace).items()
+        if not isinstance(value, dict) or value.get("saved", 0) < cutoff
+    ]
+    if expired:
+        store.delete_states(namespace, expired)
+    return len(expired)
+
+
+class FileIds:
+    """
+    Mapping from schedule cache key to the Telegram file_id of its first upload, so
+    the same schedule can be resent without uploading the bytes again. Entries
+    expire with prune(), like the cached schedules themselves.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, key):
+        value = self.store.get_state("file_ids", key)
+        # saved before entries had a timestamp: a bare file_id
+        return value.get("file_id") if isinstance(value, dict) else value
+
+    def set(self, key, file_id):
+        self.store.set_state("file_ids", key, {"file_id": file_id, "saved": time.time()})
+
+    def discard(self, key):
+        self.store.delete_state("file_ids", key)
+
+    def prune(self, max_age):
+        return prune_state(self.store, "file_ids", max_age)
+
+
+class RotationCursors:
+    """
+    Per-floor anchor of the duty rotation: the room due on a given day. Schedules of
+    the floor count on from there, so the next month continues where the previous
+    one left off instead of starting over at room 1.
+
+    Each cursor also records the holiday country its rotation skips, so everyone on
+    the floor gets the same rooms whatever their language. Cursors saved before that
+    get default_country.
+    """
+
+    def __init__(self, store, default_country=None):
+        self.store = store
+        self.default_country = default_country
+
+    def get(self, corpus, floor):
+        """
+        {"date": "dd.mm.yyyy", "room": ..., "num_rooms": ..., "country": ...} of the floor, or None.
+        """
+        cursor = self.store.get_state("rotation", f"{corpus}.{floor}")
+        if cursor is not None:
+            cursor.setdefault("country", self.default_country)
+        return cursor
+
+    def set(self, corpus, floor, date, room, num_rooms, country):
+        self.store.set_state(
+            "rotation", f"{corpus}.{floor}", {"date": date, "room": room, "num_rooms": num_rooms, "country": country},
+        )
+
+
+class ScheduleExports:
+    """
+    Parameters of each schedule sent, by its cache key, so the export buttons under
+    it can rebuild exactly that schedule's duties on any bot process. Entries expire
+    with prune() a while after the schedule was last sent.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, key):
+        """
+        {"corpus", "floor", "num_rooms", "start_date", "num_days", "language", "first_room"}, or None.
+        """
+        return self.store.get_state("exports", key)
+
+    def set(self, key, corpus, floor, num_rooms, start_date, num_days, language, first_room):
+        self.store.set_state("exports", key, {
+            "corpus": corpus, "floor": floor, "num_rooms": num_rooms, "start_date": start_date,
+            "num_days": num_days, "language": language, "first_room": first_room, "saved": time.time(),
+        })
+
+    def prune(self, max_age):
+        return prune_state(self.store, "exports", max_age)
+
+
+STORES = {
+    "sqlite": SQLiteStore,
+    "json": JsonStore,
+}
+
+
+def open_store(kind="sqlite", path=None):
+    """
+    Open the store registered under kind ("sqlite" or "json").
+    """
+    try:
+        store_class = STORES[kind]
+    except KeyError:
+        raise ValueError(f"Unknown store {kind!r}, expected one of: {', '.join(STORES)}")
+    return store_class(path) if path else store_class()
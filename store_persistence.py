@@ -0,0 +1,74 @@
+import json
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+
+class StorePersistence(BasePersistence):
+    """
+    python-telegram-bot persistence that keeps user_data, chat_data, bot_data and
+    conversation states in a Store instead of a local pickle file, so any bot
+    process started against the same store picks them up. Values must be JSON
+    serializable.
+
+    python-telegram-bot only reads persisted data at startup, so this does not make
+    a dialog that is in progress move between running processes; the steps after
+    the dialog are kept process-independent by the bot itself.
+    """
+
+    def __init__(self, store, update_interval=5):
+        super().__init__(store_data=PersistenceInput(callback_data=False), update_interval=update_interval)
+        self.store = store
+
+    async def get_user_data(self):
+        return {int(user_id): data for user_id, data in self.store.all_state("user_data").items()}
+
+    async def get_chat_data(self):
+        return {int(chat_id): data for chat_id, data in self.store.all_state("chat_data").items()}
+
+    async def get_bot_data(self):
+        return self.store.get_state("bot_data", "bot_data") or {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        return {
+            tuple(json.loads(key)): state
+            for key, state in self.store.all_state(f"conversation:{name}").items()
+        }
+
+    async def update_conversation(self, name, key, new_state):
+        if new_state is None:
+            self.store.delete_state(f"conversation:{name}", json.dumps(list(key)))
+        else:
+            self.store.set_state(f"conversation:{name}", json.dumps(list(key)), new_state)
+
+    async def update_user_data(self, user_id, data):
+        self.store.set_state("user_data", user_id, data)
+
+    async def update_chat_data(self, chat_id, data):
+        self.store.set_state("chat_data", chat_id, data)
+
+    async def update_bot_data(self, data):
+        self.store.set_state("bot_data", "bot_data", data)
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_user_data(self, user_id):
+        self.store.delete_state("user_data", user_id)
+
+    async def drop_chat_data(self, chat_id):
+        self.store.delete_state("chat_data", chat_id)
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def flush(self):
+        pass
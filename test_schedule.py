@@ -0,0 +1,162 @@
+import os
+import json
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import rate_limit
+from duty_optimizer import balanced_duties
+from exporters import export, export_ics
+from holiday_index import holiday_index
+from languages import get_language
+from rate_limit import RateLimiter, TokenBucket
+from renderers import duty_cell
+from schedule_cache import ScheduleCache
+from schedule_engine import RotationIndex, iter_duties
+from storage import SQLiteStore
+
+START = datetime(2025, 12, 1)
+NUM_DAYS = 150
+# Christmas, New Year and Easter: single holidays and runs of them
+HOLIDAYS = holiday_index("DK")
+HOLIDAY_DATES = HOLIDAYS.between(START, START + timedelta(days=NUM_DAYS))
+
+
+def test_rotation_index_matches_iter_duties():
+    num_rooms, first_room = 7, 5
+    duties = list(iter_duties(START, NUM_DAYS, num_rooms, HOLIDAYS, first_room=first_room))
+    index = RotationIndex(START, num_rooms, HOLIDAY_DATES, first_room)
+
+    for duty in duties:
+        assert index.room_on(duty.date) == duty.room
+
+    for room in range(1, num_rooms + 1):
+        expected = [duty.date.date() for duty in duties if duty.room == room][:10]
+        assert index.next_duties(room, len(expected)) == expected
+        # from the middle of the schedule on, too
+        after = START + timedelta(days=40)
+        expected = [duty.date.date() for duty in duties if duty.room == room and duty.date >= after][:5]
+        assert index.next_duties(room, len(expected), after=after) == expected
+
+
+def test_balanced_duties_skip_away_rooms():
+    num_rooms = 6
+    exclusions = {
+        1: [date(2025, 12, 1) + timedelta(days=i) for i in range(30)],
+        4: [date(2026, 1, 10) + timedelta(days=i) for i in range(0, 60, 2)],
+        6: [date(2025, 12, 20) + timedelta(days=i) for i in range(14)],
+    }
+    duties = list(balanced_duties(START, NUM_DAYS, num_rooms, HOLIDAYS, first_room=2, exclusions=exclusions))
+
+    assert len(duties) == NUM_DAYS
+    for duty in duties:
+        if duty.room is not None:
+            assert duty.date.date() not in exclusions.get(duty.room, ())
+        if duty.date.date() in HOLIDAY_DATES:
+            assert duty.room is None
+
+
+def test_ics_export_needs_a_room():
+    duties = list(iter_duties(START, 14, 4, HOLIDAYS))
+    calendar = export("ics", duties, "3D", "1", 2).decode("utf-8")
+    assert calendar.count("BEGIN:VEVENT") == sum(1 for duty in duties if duty.room == 2)
+    with pytest.raises(ValueError):
+        export("ics", duties, "3D", "1", None)
+
+
+def test_everyone_away_day_is_not_a_holiday():
+    away_day = date(2025, 12, 3)
+    exclusions = {room: [away_day] for room in (1, 2, 3)}
+    duties = list(balanced_duties(START, 5, 3, HOLIDAYS, exclusions=exclusions))
+    empty = duties[2]
+    assert (empty.room, empty.holiday) == (None, None)
+    assert duty_cell("3D", "1", empty) == "Everyone away"
+    assert export("csv", duties, "3D", "1", 1).decode("utf-8-sig").splitlines()[3].endswith(",,Everyone away")
+
+
+def test_token_bucket_refills_over_time(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=0.5, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.retry_after() == pytest.approx(2.0)
+    now[0] += 2
+    assert bucket.try_acquire()
+    now[0] += 100
+    # never more than capacity
+    assert bucket.try_acquire(2) and not bucket.try_acquire()
+
+
+def test_rate_limiter_prunes_full_buckets(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    limiter = RateLimiter(rate=1, capacity=1, max_idle_keys=2)
+    assert limiter.try_acquire("a") and limiter.try_acquire("b")
+    assert not limiter.try_acquire("a")
+    now[0] += 10
+    # both buckets have refilled, so making room for a third key drops them
+    assert limiter.try_acquire("c")
+    assert set(limiter.buckets) == {"c"}
+
+
+def test_cache_key_is_stable_and_eviction_drops_oldest(tmp_path):
+    key = ScheduleCache.key(corpus="3D", floor="1", num_rooms=13, start_date="01.10.2026")
+    assert key == ScheduleCache.key(start_date="01.10.2026", num_rooms=13, floor="1", corpus="3D")
+    assert key != ScheduleCache.key(corpus="3D", floor="1", num_rooms=12, start_date="01.10.2026")
+
+    cache = ScheduleCache(str(tmp_path), max_bytes=1500, max_age=3600)
+    now = time.time()
+    for i, name in enumerate(("old", "middle", "new")):
+        with open(f"{cache.path(name)}.pdf", "wb") as file:
+            file.write(b"x" * 700)
+        os.utime(f"{cache.path(name)}.pdf", (now - 100 + i, now - 100 + i))
+    cache.evict()
+    assert [cache.contains(name) for name in ("old", "middle", "new")] == [False, True, True]
+
+    os.utime(f"{cache.path('middle')}.pdf", (now - 7200, now - 7200))
+    cache.evict()
+    assert [cache.contains(name) for name in ("middle", "new")] == [False, True]
+
+
+def test_csv_and_json_exports():
+    duties = list(iter_duties(datetime(2025, 12, 24), 4, 3, HOLIDAYS, your_room_number=2, username="Ann"))
+    rows = export("csv", duties, "3D", "1", 2).decode("utf-8-sig").splitlines()
+    assert rows[0] == "date,weekday,room,holiday,note"
+    assert rows[1] == "2025-12-24,Wednesday,3D.1.1,,"
+    assert rows[2].startswith("2025-12-25,Thursday,,") and rows[2].endswith(",")
+
+    data = json.loads(export("json", duties, "3D", "1", 2, "uk"))
+    assert (data["corpus"], data["floor"]) == ("3D", "1")
+    assert [row["room_number"] for row in data["duties"]] == [1, None, None, 2]
+    assert data["duties"][0]["weekday"] == get_language("uk").weekday(duties[0].date)
+
+
+def test_ics_export_folds_and_escapes():
+    duties = list(iter_duties(datetime(2025, 12, 1), 10, 2))
+    calendar = export_ics(duties, "3D", "1", 1, "uk", stamp=datetime(2025, 1, 1)).decode("utf-8")
+    lines = calendar.split("\r\n")
+    assert lines[0] == "BEGIN:VCALENDAR" and lines[-2] == "END:VCALENDAR"
+    assert all(len(line.encode("utf-8")) <= 75 for line in lines)
+    assert "UID:3D-1-1-20251201@dorm-bot" in lines
+    assert calendar.count("BEGIN:VEVENT") == 5
+    assert "\\," in calendar.replace("\r\n ", "")
+
+
+def test_sqlite_job_queue_claim_and_cancel(tmp_path):
+    store = SQLiteStore(str(tmp_path / "jobs.sqlite3"))
+    first = store.enqueue_job({"task": "generate_pdf", "args": [1]})
+    second = store.enqueue_job({"task": "generate_pdf", "args": [2]})
+    assert store.queued_jobs() == 2
+    assert (store.job_position(first), store.job_position(second)) == (1, 2)
+
+    assert store.cancel_job(second)
+    assert store.job_status(second)[0] == "cancelled"
+    assert store.claim_job("worker") == (first, {"task": "generate_pdf", "args": [1]})
+    # claimed jobs can no longer be cancelled, and cancelled ones are never claimed
+    assert not store.cancel_job(first)
+    assert store.claim_job("worker") is None
+
+    store.finish_job(first, result="Schedule/abc")
+    assert store.job_status(first) == ("done", "Schedule/abc", None)